@@ -26,15 +26,15 @@ with DAG(
 
     def run_ingestion(ti):
         """
-        This function calls our Python script `ingest_polygon.py` 
-        with yesterday's date (YYYY-MM-DD) as an argument.
+        This function calls `finance.py ingest` with yesterday's date
+        (YYYY-MM-DD) as an argument.
         """
         yesterday = (date.today() - timedelta(days=1)).strftime('%Y-%m-%d')
 
         # Path where your scripts folder is mounted in the Airflow container
-        script_path = "/opt/airflow/scripts/ingest_polygon.py"
+        script_path = "/opt/airflow/scripts/finance.py"
 
-        cmd = ["python", script_path, yesterday]
+        cmd = ["python", script_path, "ingest", yesterday]
         print(f"Running command: {cmd}")
 
         # Run the ingestion script
@@ -54,9 +54,9 @@ with DAG(
         if not ingested_date:
             raise ValueError("No ingested_date found in XCom!")
 
-        transform_script = "/opt/airflow/scripts/transform_data.py"
+        script_path = "/opt/airflow/scripts/finance.py"
 
-        cmd = ["python", transform_script, ingested_date]
+        cmd = ["python", script_path, "transform", ingested_date]
         print(f"Running transform command: {cmd}")
         subprocess.run(cmd, check=True)
 
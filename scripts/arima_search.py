@@ -0,0 +1,197 @@
+import hashlib
+import numpy as np
+from pmdarima import auto_arima
+from pmdarima.arima import ndiffs, nsdiffs
+from pmdarima.utils import diff
+
+from db import connect
+from profiling import phase
+
+# Same tests and limits auto_arima uses when d / D are left to it
+DIFF_TEST = "kpss"
+SEASONAL_DIFF_TEST = "ocsb"
+MAX_D = 2
+MAX_SEASONAL_D = 1
+
+def data_fingerprint(y):
+    """
+    Stable hash of a training series, used to key cached differencing tests.
+    """
+    values = np.ascontiguousarray(np.asarray(y, dtype="float64"))
+    return hashlib.sha1(values.tobytes()).hexdigest()
+
+class ArimaSearchCache:
+    """
+    Remembers what previous auto_arima searches found so the next one can skip work:
+      - differencing orders (d, D) per (ticker, data fingerprint, m), shared by
+        every seasonal config fitted on the same data;
+      - the last best order per (ticker, seasonal, m), used as the stepwise
+        search's starting point. New tickers start from the most common best
+        order among tickers with the same differencing profile.
+
+    Use as a context manager so the database connection is closed even if a
+    search fails.
+    """
+    def __init__(self, db_config):
+        self.db_config = db_config
+        self._conn = None
+        self._diff_orders = {}
+
+    def _cursor(self):
+        if self._conn is None:
+            self._conn = connect(self.db_config)
+            self._conn.autocommit = True
+        return self._conn.cursor()
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def diff_orders(self, ticker, y, m=1):
+        """
+        Returns (d, D) for `y`, running the unit-root tests only if this exact
+        series has not been tested before.
+        """
+        key = (ticker, data_fingerprint(y), m)
+        if key in self._diff_orders:
+            return self._diff_orders[key]
+
+        cur = self._cursor()
+        cur.execute(
+            "SELECT d, seasonal_d FROM arima_diff_tests WHERE ticker = %s AND fingerprint = %s AND m = %s",
+            key
+        )
+        row = cur.fetchone()
+        if row is None:
+            if m > 1:
+                seasonal_d = nsdiffs(y, m=m, test=SEASONAL_DIFF_TEST, max_D=MAX_SEASONAL_D)
+                if seasonal_d == 0:
+                    # No seasonal differencing: d is the same as for the non-seasonal config
+                    d, _ = self.diff_orders(ticker, y, 1)
+                else:
+                    d = ndiffs(diff(np.asarray(y), lag=m, differences=seasonal_d), test=DIFF_TEST, max_d=MAX_D)
+            else:
+                seasonal_d = 0
+                d = ndiffs(y, test=DIFF_TEST, max_d=MAX_D)
+
+            row = (int(d), int(seasonal_d))
+            cur.execute("""
+                INSERT INTO arima_diff_tests (ticker, fingerprint, m, d, seasonal_d)
+                VALUES (%s, %s, %s, %s, %s)
+                ON CONFLICT (ticker, fingerprint, m) DO NOTHING
+            """, key + row)
+        cur.close()
+
+        self._diff_orders[key] = tuple(row)
+        return self._diff_orders[key]
+
+    def warm_start(self, ticker, seasonal, m, d, seasonal_d):
+        """
+        Returns the starting order for the next search as a dict, or None if
+        nothing is known yet. `source` is "ticker" for the ticker's own last
+        best order and "prior" for the profile-wide most common order.
+        """
+        cur = self._cursor()
+        cur.execute("""
+            SELECT p, q, seasonal_p, seasonal_q, aic, nobs
+            FROM arima_warm_starts
+            WHERE ticker = %s AND seasonal = %s AND m = %s
+        """, (ticker, seasonal, m))
+        row = cur.fetchone()
+        if row is not None:
+            cur.close()
+            p, q, sp, sq, aic, nobs = row
+            return {"source": "ticker", "p": p, "q": q, "P": sp, "Q": sq, "aic": aic, "nobs": nobs}
+
+        cur.execute("""
+            SELECT p, q, seasonal_p, seasonal_q
+            FROM arima_warm_starts
+            WHERE seasonal = %s AND m = %s AND d = %s AND seasonal_d = %s
+            GROUP BY p, q, seasonal_p, seasonal_q
+            ORDER BY COUNT(*) DESC
+            LIMIT 1
+        """, (seasonal, m, d, seasonal_d))
+        row = cur.fetchone()
+        cur.close()
+        if row is None:
+            return None
+        p, q, sp, sq = row
+        return {"source": "prior", "p": p, "q": q, "P": sp, "Q": sq}
+
+    def record_best(self, ticker, seasonal, m, model, nobs):
+        order = model.order
+        seasonal_order = model.seasonal_order
+        cur = self._cursor()
+        cur.execute("""
+            INSERT INTO arima_warm_starts
+                (ticker, seasonal, m, p, d, q, seasonal_p, seasonal_d, seasonal_q, aic, nobs, updated_at)
+            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, CURRENT_TIMESTAMP)
+            ON CONFLICT (ticker, seasonal, m) DO UPDATE SET
+                p = EXCLUDED.p, d = EXCLUDED.d, q = EXCLUDED.q,
+                seasonal_p = EXCLUDED.seasonal_p, seasonal_d = EXCLUDED.seasonal_d,
+                seasonal_q = EXCLUDED.seasonal_q, aic = EXCLUDED.aic, nobs = EXCLUDED.nobs,
+                updated_at = CURRENT_TIMESTAMP
+        """, (
+            ticker, bool(seasonal), int(m),
+            int(order[0]), int(order[1]), int(order[2]),
+            int(seasonal_order[0]), int(seasonal_order[1]), int(seasonal_order[2]),
+            float(model.aic()), int(nobs)
+        ))
+        cur.close()
+
+def fit_auto_arima(y, ticker, cache, seasonal=False, m=1, tolerance=0.01, **kwargs):
+    """
+    Drop-in replacement for auto_arima(y, seasonal=seasonal, m=m, **kwargs) that
+    reuses cached differencing tests and warm-starts the stepwise search.
+
+    If the warm-started model's AIC per observation is more than `tolerance`
+    (relative) worse than the ticker's previous best, an exhaustive
+    (stepwise=False) search over the caller's bounds is run as well and the
+    better of the two is kept. auto_arima's max_order still caps that grid.
+    """
+    if not seasonal:
+        m = 1
+    y = np.asarray(y, dtype="float64")
+    with phase("diff_tests"):
+        d, seasonal_d = cache.diff_orders(ticker, y, m)
+
+    search = dict(kwargs)
+    search.update(seasonal=seasonal, m=m, d=d)
+    if seasonal:
+        search["D"] = seasonal_d
+
+    prior = cache.warm_start(ticker, seasonal, m, d, seasonal_d)
+    warm = dict(search)
+    if prior is not None:
+        # Keep the starting point inside the caller's (or auto_arima's default) search bounds
+        warm["start_p"] = min(prior["p"], kwargs.get("max_p", 5))
+        warm["start_q"] = min(prior["q"], kwargs.get("max_q", 5))
+        if seasonal:
+            warm["start_P"] = min(prior["P"], kwargs.get("max_P", 2))
+            warm["start_Q"] = min(prior["Q"], kwargs.get("max_Q", 2))
+        print(f"Warm-starting {ticker} search from ({warm['start_p']}, {d}, {warm['start_q']}) "
+              f"[{prior['source']}]")
+
+    with phase("stepwise_search"):
+        model = auto_arima(y, **warm)
+
+    if prior is not None and prior["source"] == "ticker" and prior["aic"] is not None and prior["nobs"]:
+        previous = prior["aic"] / prior["nobs"]
+        current = model.aic() / len(y)
+        if current > previous + tolerance * abs(previous):
+            print(f"Warm-started fit for {ticker} got worse (AIC/obs {current:.4f} vs {previous:.4f}); "
+                  f"running full search.")
+            with phase("full_search"):
+                full_model = auto_arima(y, **dict(search, stepwise=False))
+            if full_model.aic() < model.aic():
+                model = full_model
+
+    cache.record_best(ticker, seasonal, m, model, len(y))
+    return model
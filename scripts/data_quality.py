@@ -0,0 +1,327 @@
+#!/usr/bin/env python
+"""
+Validation stage for grouped daily bars, run by ingest_polygon.py between
+parsing and loading. A day's batch is checked with array operations; each
+row gets a bit mask of failed checks and rows with any bit set are written
+to daily_bars_quarantine (sql/create_quality_tables.sql) instead of
+daily_bars.
+
+    python data_quality.py summary --start 2025-01-01 --end 2025-01-31
+    python data_quality.py bench --rows 12000
+"""
+import os
+import sys
+import time
+import random
+import argparse
+import numpy as np
+from psycopg2.extras import execute_values, Json
+
+from db import connect
+
+# Bit i of a row's flags is set when check REASON_CODES[i] failed
+REASON_CODES = (
+    "INVALID_TICKER",            # missing, or longer than daily_bars.ticker allows
+    "DUPLICATE",                 # ticker appears more than once in the batch
+    "MISSING_OHLC",              # open, high, low or close missing
+    "PRICE_OUT_OF_RANGE",        # a price <= 0 or too large for NUMERIC(12, 4)
+    "HIGH_LT_LOW",
+    "OPEN_CLOSE_OUTSIDE_RANGE",  # open or close outside [low, high]
+    "ZERO_VOLUME",               # volume missing or <= 0
+    "PRICE_JUMP",                # close moved more than MAX_PRICE_RATIO from the previous close
+)
+FLAGS = {code: np.uint16(1 << i) for i, code in enumerate(REASON_CODES)}
+
+TICKER_MAX_LENGTH = 10
+MAX_PRICE = 1e8
+# Polygon and daily_bars both round prices to 4 decimals
+PRICE_EPSILON = 1e-4
+# Closes more than this many times above (or below 1/this of) the previous close are rejected
+MAX_PRICE_RATIO = float(os.getenv("DQ_MAX_PRICE_RATIO", 3.0))
+
+def parse_grouped_daily(results):
+    """
+    Turns Polygon's grouped daily results into column arrays. Missing
+    numbers become NaN and missing tickers empty strings.
+    """
+    tickers = np.array([item.get("T") or "" for item in results], dtype=str)
+    values = np.array(
+        [(item.get("o"), item.get("h"), item.get("l"), item.get("c"), item.get("v")) for item in results],
+        dtype="float64"
+    ).reshape(len(results), 5)
+    return {
+        "ticker": tickers,
+        "open": values[:, 0],
+        "high": values[:, 1],
+        "low": values[:, 2],
+        "close": values[:, 3],
+        "volume": values[:, 4],
+    }
+
+def previous_closes(conn, date_str):
+    """
+    Returns (tickers, closes) from the last trading date before `date_str`.
+    Rows quarantined only for PRICE_JUMP on that date are included, so a
+    genuine move is checked against the new level the next day instead of
+    getting every following day quarantined as well.
+    """
+    cur = conn.cursor()
+    cur.execute("""
+        WITH prev AS (
+            SELECT MAX(trading_date) AS trading_date FROM daily_bars WHERE trading_date < %s
+        )
+        SELECT b.ticker, b.close::float8
+        FROM daily_bars b JOIN prev ON b.trading_date = prev.trading_date
+        UNION ALL
+        SELECT q.ticker, q.close
+        FROM daily_bars_quarantine q JOIN prev ON q.trading_date = prev.trading_date
+        WHERE q.reason_codes = ARRAY['PRICE_JUMP']
+    """, (date_str,))
+    rows = cur.fetchall()
+    cur.close()
+    tickers = np.array([r[0] for r in rows], dtype=str)
+    closes = np.array([r[1] for r in rows], dtype="float64")
+    return tickers, closes
+
+def align_previous_closes(tickers, prev_tickers, prev_closes):
+    """
+    Previous close for each ticker in the batch, NaN where unknown.
+    `prev_tickers` may be in any order.
+    """
+    aligned = np.full(len(tickers), np.nan)
+    if len(prev_tickers) == 0 or len(tickers) == 0:
+        return aligned
+    order = np.argsort(prev_tickers, kind="stable")
+    sorted_tickers = prev_tickers[order]
+    pos = np.minimum(np.searchsorted(sorted_tickers, tickers), len(sorted_tickers) - 1)
+    found = sorted_tickers[pos] == tickers
+    aligned[found] = prev_closes[order][pos[found]]
+    return aligned
+
+def validate_batch(bars, prev_close=None):
+    """
+    Checks every row of a parsed batch (see parse_grouped_daily) and returns
+    a uint16 array of REASON_CODES bit flags; 0 means the row is valid.
+    `prev_close` is the aligned previous close per row (NaN if unknown).
+    """
+    tickers = bars["ticker"]
+    o, h, l, c, v = bars["open"], bars["high"], bars["low"], bars["close"], bars["volume"]
+    flags = np.zeros(len(tickers), dtype=np.uint16)
+
+    def flag(code, mask):
+        flags[mask] |= FLAGS[code]
+
+    lengths = np.char.str_len(tickers)
+    flag("INVALID_TICKER", (lengths == 0) | (lengths > TICKER_MAX_LENGTH))
+
+    if len(tickers):
+        order = np.argsort(tickers, kind="stable")
+        same = tickers[order][1:] == tickers[order][:-1]
+        duplicate = np.zeros(len(tickers), dtype=bool)
+        duplicate[order[1:][same]] = True
+        duplicate[order[:-1][same]] = True
+        flag("DUPLICATE", duplicate)
+
+    prices = np.stack([o, h, l, c])
+    flag("MISSING_OHLC", np.isnan(prices).any(axis=0))
+    # NaN compares False, so missing prices only raise MISSING_OHLC
+    flag("PRICE_OUT_OF_RANGE", ((prices <= 0) | (prices >= MAX_PRICE)).any(axis=0))
+    flag("HIGH_LT_LOW", h < l - PRICE_EPSILON)
+    flag("OPEN_CLOSE_OUTSIDE_RANGE",
+         (o < l - PRICE_EPSILON) | (o > h + PRICE_EPSILON) | (c < l - PRICE_EPSILON) | (c > h + PRICE_EPSILON))
+    flag("ZERO_VOLUME", ~(v > 0))
+
+    if prev_close is not None:
+        with np.errstate(divide="ignore", invalid="ignore"):
+            ratio = c / np.where(prev_close > 0, prev_close, np.nan)
+        flag("PRICE_JUMP", (ratio > MAX_PRICE_RATIO) | (ratio < 1 / MAX_PRICE_RATIO))
+
+    return flags
+
+def reason_counts(flags):
+    """Number of rows failing each check (a row can fail several)."""
+    return {code: int(np.count_nonzero(flags & bit)) for code, bit in FLAGS.items() if np.any(flags & bit)}
+
+def reasons_for(row_flags):
+    return [code for code, bit in FLAGS.items() if row_flags & bit]
+
+def quarantine_rows(cur, date_str, bars, flags, prev_close, results):
+    """
+    Replaces `date_str`'s quarantined rows with the rejected rows of this
+    batch, so re-ingesting a date does not duplicate them. `results` is the
+    raw Polygon list the batch was parsed from. Returns the number of rows.
+    """
+    cur.execute("DELETE FROM daily_bars_quarantine WHERE trading_date = %s", (date_str,))
+    rejected = np.flatnonzero(flags)
+    if len(rejected) == 0:
+        return 0
+
+    def value(x):
+        return None if np.isnan(x) else float(x)
+
+    rows = [
+        (
+            results[i].get("T"), date_str,
+            value(bars["open"][i]), value(bars["high"][i]), value(bars["low"][i]),
+            value(bars["close"][i]), value(bars["volume"][i]),
+            value(prev_close[i]) if prev_close is not None else None,
+            reasons_for(flags[i]), Json(results[i]),
+        )
+        for i in rejected
+    ]
+    execute_values(cur, """
+        INSERT INTO daily_bars_quarantine
+            (ticker, trading_date, open, high, low, close, volume, prev_close, reason_codes, raw)
+        VALUES %s
+    """, rows)
+    return len(rows)
+
+def synthetic_results(rows, fault_rate=0.01, seed=0):
+    """
+    Polygon-shaped grouped daily results with a share of faulty rows, and
+    a plausible previous close for each row.
+    """
+    rng = random.Random(seed)
+    results, prev_closes = [], []
+    for i in range(rows):
+        close = rng.uniform(1, 500)
+        prev_closes.append(close * rng.uniform(0.9, 1.1))
+        open_price = close * rng.uniform(0.95, 1.05)
+        item = {
+            "T": f"TK{i:05d}",
+            "o": round(open_price, 4),
+            "h": round(max(open_price, close) * rng.uniform(1, 1.02), 4),
+            "l": round(min(open_price, close) * rng.uniform(0.98, 1), 4),
+            "c": round(close, 4),
+            "v": float(rng.randint(100, 10_000_000)),
+            "vw": round(close, 4),
+            "t": 1736456400000,
+            "n": rng.randint(1, 50000),
+        }
+        if rng.random() < fault_rate:
+            fault = rng.choice(("missing", "inverted", "volume", "jump", "duplicate"))
+            if fault == "missing":
+                item.pop(rng.choice(("o", "h", "l", "c")))
+            elif fault == "inverted":
+                item["h"], item["l"] = item["l"], item["h"]
+            elif fault == "volume":
+                item["v"] = 0
+            elif fault == "jump":
+                item["c"] = item["h"] = round(close * 10, 4)
+            elif results:
+                item["T"] = results[-1]["T"]
+        results.append(item)
+    # Polygon does not return the batch sorted by ticker
+    rng.shuffle(results)
+    return results, prev_closes
+
+def benchmark(rows, repeat, date_str=None):
+    """
+    Times validation against the rest of the local ingest work (parsing and
+    building the COPY buffer) for a synthetic batch, and against fetching
+    `date_str` from POLYGON_BASE_URL if given.
+    """
+    import io
+    import csv
+
+    results, prev_closes = synthetic_results(rows)
+    prev_tickers = np.array([f"TK{i:05d}" for i in range(rows)], dtype=str)
+    prev_closes = np.array(prev_closes, dtype="float64")
+
+    timings = {"parse": [], "validate": [], "copy_buffer": []}
+    for _ in range(repeat):
+        start = time.perf_counter()
+        bars = parse_grouped_daily(results)
+        timings["parse"].append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        prev_close = align_previous_closes(bars["ticker"], prev_tickers, prev_closes)
+        flags = validate_batch(bars, prev_close)
+        timings["validate"].append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        ok = flags == 0
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows(zip(
+            bars["ticker"][ok].tolist(), bars["open"][ok].tolist(), bars["high"][ok].tolist(),
+            bars["low"][ok].tolist(), bars["close"][ok].tolist(), np.rint(bars["volume"][ok]).astype(np.int64).tolist()
+        ))
+        timings["copy_buffer"].append(time.perf_counter() - start)
+
+    median = {name: float(np.median(values)) for name, values in timings.items()}
+    local = sum(median.values())
+    print(f"{rows} rows, median of {repeat} runs:")
+    for name, seconds in median.items():
+        print(f"  {name:<12}{seconds * 1000:>9.2f} ms")
+    print(f"  rejected    {np.count_nonzero(flags):>9d} rows {reason_counts(flags)}")
+    print(f"Validation is {median['validate'] / local * 100:.1f}% of local parse + validate + COPY buffer time")
+
+    if date_str:
+        from ingest_polygon import fetch_grouped_daily
+        start = time.perf_counter()
+        data = fetch_grouped_daily(date_str, os.getenv("POLYGON_API_KEY", ""))
+        fetch = time.perf_counter() - start
+        if not data or not data.get("results"):
+            print(f"No results fetched for {date_str}.")
+            return
+        fetched = len(data["results"])
+        # Scale the synthetic timings to the fetched batch size
+        validate = median["validate"] * fetched / rows
+        total = fetch + local * fetched / rows
+        print(f"Fetching {date_str} ({fetched} rows) took {fetch:.2f} s; "
+              f"validation is {validate / total * 100:.2f}% of fetch + local work")
+
+def summary(db_config, start, end):
+    conn = connect(db_config)
+    cur = conn.cursor()
+    cur.execute("""
+        SELECT code, COUNT(*), COUNT(DISTINCT ticker), MIN(trading_date), MAX(trading_date)
+        FROM daily_bars_quarantine, unnest(reason_codes) AS code
+        WHERE trading_date BETWEEN %s AND %s
+        GROUP BY code
+        ORDER BY COUNT(*) DESC
+    """, (start, end))
+    rows = cur.fetchall()
+    cur.close()
+    conn.close()
+
+    if not rows:
+        print(f"No quarantined rows between {start} and {end}.")
+        return
+    print(f"{'reason':<26}{'rows':>8}{'tickers':>9}  first       last")
+    for code, count, tickers, first, last in rows:
+        print(f"{code:<26}{count:>8}{tickers:>9}  {first}  {last}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Data-quality checks for grouped daily bars.")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("summary", help="Quarantined rows per reason code")
+    p.add_argument("--start", required=True)
+    p.add_argument("--end", required=True)
+
+    p = sub.add_parser("bench", help="Benchmark validation on a synthetic batch")
+    p.add_argument("--rows", type=int, default=12000, help="Rows per batch (about one day of US stocks)")
+    p.add_argument("--repeat", type=int, default=20)
+    p.add_argument("--date", help="Also fetch this date from POLYGON_BASE_URL for comparison")
+
+    args = parser.parse_args()
+
+    if args.command == "bench":
+        benchmark(args.rows, args.repeat, args.date)
+        return
+
+    db_config = {
+        "user": os.getenv("POSTGRES_USER"),
+        "password": os.getenv("POSTGRES_PASSWORD"),
+        "host": os.getenv("POSTGRES_HOST", "localhost"),
+        "port": os.getenv("POSTGRES_PORT", 5432),
+        "dbname": os.getenv("POSTGRES_DB"),
+    }
+    if not db_config["password"]:
+        print("Error: POSTGRES_PASSWORD is not set in environment variables.")
+        sys.exit(1)
+    summary(db_config, args.start, args.end)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,14 @@
+import psycopg2
+
+def connect(db_config):
+    """
+    Opens a Postgres connection from a db_config dict
+    (user, password, host, port, dbname).
+    """
+    return psycopg2.connect(
+        user=db_config["user"],
+        password=db_config["password"],
+        host=db_config["host"],
+        port=db_config["port"],
+        database=db_config["dbname"]
+    )
@@ -0,0 +1,170 @@
+#!/usr/bin/env python
+"""
+Single entry point for the pipeline's units of work:
+
+    python finance.py ingest 2025-02-12 2025-02-13
+    python finance.py transform 2025-02-12
+    python finance.py backfill 2025-01-01 2025-01-31
+    python finance.py train-arima AAPL MSFT
+    python finance.py train-lstm AAPL
+    python finance.py tune arima AAPL MSFT
+
+Each subcommand accepts several dates or tickers and runs them one after
+another in this process, so imports and module setup are paid once. Heavy
+libraries (pandas, statsmodels, pmdarima, TensorFlow) are only imported by
+the subcommands that need them; keep the imports at the top of this file to
+the standard library.
+"""
+import os
+import sys
+import time
+import argparse
+from datetime import datetime, timedelta
+
+_started = time.perf_counter()
+
+def _db_config():
+    return {
+        "user": os.getenv("POSTGRES_USER"),
+        "password": os.getenv("POSTGRES_PASSWORD"),
+        "host": os.getenv("POSTGRES_HOST", "localhost"),
+        "port": os.getenv("POSTGRES_PORT", 5432),
+        "dbname": os.getenv("POSTGRES_DB"),
+    }
+
+def _require_env(*names):
+    missing = [name for name in names if not os.getenv(name)]
+    if missing:
+        sys.exit(f"Error: {', '.join(missing)} not set in environment variables.")
+
+def _date(value):
+    try:
+        datetime.strptime(value, "%Y-%m-%d")
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected YYYY-MM-DD, got {value!r}")
+    return value
+
+def _run_units(label, units, func, timing):
+    """
+    Runs func(unit) for each unit, reporting failures and carrying on with the
+    rest. Returns the number of failed units.
+    """
+    failed = 0
+    for unit in units:
+        start = time.perf_counter()
+        try:
+            func(unit)
+        except SystemExit as e:
+            # The scripts exit with a message (or a status) when a unit can't run
+            if e.code not in (None, 0):
+                failed += 1
+                if not isinstance(e.code, int):
+                    print(f"{label} {unit} failed: {e.code}")
+        except Exception as e:
+            failed += 1
+            print(f"{label} {unit} failed: {e}")
+        if timing:
+            print(f"[timing] {label} {unit}: {time.perf_counter() - start:.2f}s")
+    return failed
+
+def cmd_ingest(args):
+    _require_env("POSTGRES_PASSWORD", "POLYGON_API_KEY")
+    from ingest_polygon import ingest_date
+
+    api_key = os.getenv("POLYGON_API_KEY")
+    db_config = _db_config()
+    return _run_units("ingest", args.dates, lambda d: ingest_date(d, api_key, db_config), args.timing)
+
+def cmd_transform(args):
+    from transform_data import compute_daily_returns
+    return _run_units("transform", args.dates, compute_daily_returns, args.timing)
+
+def cmd_backfill(args):
+    _require_env("POSTGRES_PASSWORD", "POLYGON_API_KEY")
+    from ingest_polygon import ingest_date
+    from transform_data import compute_daily_returns
+
+    api_key = os.getenv("POLYGON_API_KEY")
+    db_config = _db_config()
+
+    def backfill_date(date_str):
+        # Returns need the previous day's close, so transform right after each ingest.
+        # Transform even when nothing new was inserted: the date may have been loaded
+        # by an earlier --no-transform or interrupted backfill.
+        if ingest_date(date_str, api_key, db_config) is not None and not args.no_transform:
+            compute_daily_returns(date_str)
+
+    day = datetime.strptime(args.start, "%Y-%m-%d")
+    end = datetime.strptime(args.end, "%Y-%m-%d")
+    dates = []
+    while day <= end:
+        # Weekends are never trading dates; holidays come back empty and are skipped
+        if day.weekday() < 5:
+            dates.append(day.strftime("%Y-%m-%d"))
+        day += timedelta(days=1)
+    return _run_units("backfill", dates, backfill_date, args.timing)
+
+def cmd_train_arima(args):
+    from train_model import run
+    return _run_units("train-arima", args.tickers, run, args.timing)
+
+def cmd_train_lstm(args):
+    from train_lstm import run
+    return _run_units("train-lstm", args.tickers, run, args.timing)
+
+def cmd_tune(args):
+    if args.model == "arima":
+        from train_arima_tuning import run
+    else:
+        from train_lstm_tuning import run
+    return _run_units(f"tune-{args.model}", args.tickers, run, args.timing)
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="finance", description="Finance pipeline command line.")
+    parser.add_argument("--timing", action="store_true",
+                        help="Print startup time and the duration of each unit of work")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("ingest", help="Ingest Polygon grouped daily bars for one or more dates")
+    p.add_argument("dates", nargs="+", type=_date, metavar="DATE")
+    p.set_defaults(func=cmd_ingest)
+
+    p = sub.add_parser("transform", help="Compute daily returns for one or more dates")
+    p.add_argument("dates", nargs="+", type=_date, metavar="DATE")
+    p.set_defaults(func=cmd_transform)
+
+    p = sub.add_parser("backfill", help="Ingest and transform every weekday in a date range")
+    p.add_argument("start", type=_date)
+    p.add_argument("end", type=_date)
+    p.add_argument("--no-transform", action="store_true", help="Only ingest, skip daily returns")
+    p.set_defaults(func=cmd_backfill)
+
+    p = sub.add_parser("train-arima", help="Train and save ARIMA models")
+    p.add_argument("tickers", nargs="+", metavar="TICKER")
+    p.set_defaults(func=cmd_train_arima)
+
+    p = sub.add_parser("train-lstm", help="Train and save LSTM models")
+    p.add_argument("tickers", nargs="+", metavar="TICKER")
+    p.set_defaults(func=cmd_train_lstm)
+
+    p = sub.add_parser("tune", help="Run hyperparameter tuning")
+    p.add_argument("model", choices=["arima", "lstm"])
+    p.add_argument("tickers", nargs="+", metavar="TICKER")
+    p.set_defaults(func=cmd_tune)
+
+    return parser
+
+def main():
+    args = build_parser().parse_args()
+    if args.timing:
+        print(f"[timing] startup: {time.perf_counter() - _started:.3f}s")
+
+    start = time.perf_counter()
+    failed = args.func(args)
+    if args.timing:
+        print(f"[timing] {args.command} total: {time.perf_counter() - start:.2f}s")
+    if failed:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
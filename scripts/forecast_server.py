@@ -0,0 +1,386 @@
+#!/usr/bin/env python
+import os
+import json
+import time
+import queue
+import argparse
+import threading
+import socketserver
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+import numpy as np
+import pandas as pd
+
+from model_store import MODEL_KINDS, load_model, model_mtime, validate_ticker
+
+MAX_STEPS = 250
+# Seconds a request waits for its forecast before answering 504
+REQUEST_TIMEOUT = float(os.getenv("FORECAST_REQUEST_TIMEOUT", 30))
+
+def forecast_arima(model_fit, steps):
+    """
+    n-step forecast from a persisted statsmodels ARIMA results object.
+    Returns (dates, values) as plain lists.
+    """
+    forecast = model_fit.forecast(steps=steps)
+    dates = [d.strftime("%Y-%m-%d") for d in forecast.index]
+    return dates, [float(v) for v in forecast.values]
+
+def forecast_lstm(model_and_meta, steps):
+    """
+    Recursive n-step forecast from a persisted LSTM: each prediction is fed
+    back into the input window for the next step.
+    Returns (dates, values) as plain lists.
+    """
+    model, meta = model_and_meta
+    window = np.asarray(meta["last_window"], dtype="float32")
+
+    preds_scaled = []
+    for _ in range(steps):
+        # Calling the model directly avoids Keras' predict() overhead for one sample
+        yhat = float(model(window.reshape(1, -1, 1), training=False).numpy()[0, 0])
+        preds_scaled.append(yhat)
+        window = np.append(window[1:], yhat).astype("float32")
+
+    values = meta["scaler"].inverse_transform(np.array(preds_scaled).reshape(-1, 1)).flatten()
+    dates = pd.bdate_range(pd.Timestamp(meta["last_date"]) + pd.offsets.BDay(1), periods=steps)
+    return [d.strftime("%Y-%m-%d") for d in dates], [float(v) for v in values]
+
+FORECASTERS = {
+    "arima": forecast_arima,
+    "lstm": forecast_lstm,
+}
+
+class ModelCache:
+    """
+    Keeps loaded models in memory, evicting the least recently used one
+    once `capacity` models are held. A cached model is reloaded when its
+    files on disk are newer than when it was loaded (e.g. after the nightly
+    retrain), so hits never serve a stale model.
+    """
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self._models = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.reloads = 0
+
+    def get(self, kind, ticker):
+        key = (kind, ticker)
+        try:
+            mtime = model_mtime(kind, ticker)
+        except FileNotFoundError:
+            # Files removed since loading: keep serving the cached model if there is one
+            mtime = None
+
+        with self._lock:
+            if key in self._models:
+                model, loaded_mtime = self._models[key]
+                if mtime is None or mtime <= loaded_mtime:
+                    self._models.move_to_end(key)
+                    self.hits += 1
+                    return model
+                reload = True
+            else:
+                reload = False
+
+        # Load outside the lock so a slow load doesn't block cache hits
+        model = load_model(kind, ticker)
+
+        with self._lock:
+            if reload:
+                self.reloads += 1
+            else:
+                self.misses += 1
+            self._models[key] = (model, mtime)
+            self._models.move_to_end(key)
+            while len(self._models) > self.capacity:
+                self._models.popitem(last=False)
+        return model
+
+    def invalidate(self, kind=None, tickers=None):
+        """
+        Drops cached models so the next request loads them from disk. With no
+        arguments the whole cache is cleared. Returns the number dropped.
+        """
+        with self._lock:
+            keys = [
+                key for key in self._models
+                if (kind is None or key[0] == kind) and (tickers is None or key[1] in tickers)
+            ]
+            for key in keys:
+                del self._models[key]
+        return len(keys)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "size": len(self._models),
+                "capacity": self.capacity,
+                "hits": self.hits,
+                "misses": self.misses,
+                "reloads": self.reloads,
+            }
+
+class ForecastBatcher:
+    """
+    Collects forecast requests arriving within `batch_window` seconds and
+    answers every request for the same (model kind, ticker) with a single
+    forecast call for the largest requested horizon.
+    """
+    def __init__(self, cache, batch_window=0.005, max_batch=4096, workers=4):
+        self.cache = cache
+        self.batch_window = batch_window
+        self.max_batch = max_batch
+        self._queue = queue.Queue()
+        self._executor = ThreadPoolExecutor(max_workers=workers)
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def submit(self, kind, ticker, steps):
+        future = Future()
+        self._queue.put((kind, ticker, steps, future))
+        return future
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.batch_window
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+
+            # A bad request must only fail its own future; if this thread dies,
+            # every later request waits forever
+            groups = {}
+            for kind, ticker, steps, future in batch:
+                try:
+                    groups.setdefault((kind, ticker), []).append((steps, future))
+                except Exception as e:
+                    future.set_exception(e)
+            for (kind, ticker), pending in groups.items():
+                try:
+                    self._executor.submit(self._forecast_group, kind, ticker, pending)
+                except Exception as e:
+                    for _, future in pending:
+                        future.set_exception(e)
+
+    def _forecast_group(self, kind, ticker, pending):
+        steps = max(s for s, _ in pending)
+        try:
+            model = self.cache.get(kind, ticker)
+            dates, values = FORECASTERS[kind](model, steps)
+        except Exception as e:
+            for _, future in pending:
+                future.set_exception(e)
+            return
+
+        for s, future in pending:
+            future.set_result({
+                "ticker": ticker,
+                "model": kind,
+                "dates": dates[:s],
+                "values": values[:s],
+            })
+
+def parse_forecast_args(kind, steps):
+    if kind not in MODEL_KINDS:
+        raise ValueError(f"model must be one of {', '.join(MODEL_KINDS)}")
+    try:
+        steps = int(steps)
+    except (TypeError, ValueError):
+        raise ValueError("steps must be an integer")
+    if not 1 <= steps <= MAX_STEPS:
+        raise ValueError(f"steps must be between 1 and {MAX_STEPS}")
+    return kind, steps
+
+class ForecastHandler(BaseHTTPRequestHandler):
+    """
+    GET  /forecast?ticker=AAPL&model=arima&steps=5
+    POST /forecast  {"tickers": ["AAPL", "MSFT"], "model": "arima", "steps": 5}
+    POST /invalidate  {"tickers": ["AAPL"], "model": "arima"}  (both optional)
+    GET  /health
+    """
+    def address_string(self):
+        # Unix-socket clients have no (host, port) address
+        if isinstance(self.client_address, tuple):
+            return super().address_string()
+        return "unix"
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        if url.path == "/health":
+            self._send_json(200, {"status": "ok", "cache": self.server.cache.stats()})
+            return
+        if url.path != "/forecast":
+            self._send_json(404, {"error": f"Unknown path {url.path}"})
+            return
+
+        params = parse_qs(url.query)
+        ticker = params.get("ticker", [None])[0]
+        if not ticker:
+            self._send_json(400, {"error": "ticker is required"})
+            return
+        try:
+            validate_ticker(ticker)
+            kind, steps = parse_forecast_args(params.get("model", ["arima"])[0], params.get("steps", [1])[0])
+            result = self.server.batcher.submit(kind, ticker, steps).result(timeout=self.server.request_timeout)
+        except FutureTimeoutError:
+            self._send_json(504, {"error": "Timed out waiting for the forecast"})
+            return
+        except ValueError as e:
+            self._send_json(400, {"error": str(e)})
+            return
+        except FileNotFoundError as e:
+            self._send_json(404, {"error": str(e)})
+            return
+        except Exception as e:
+            self._send_json(500, {"error": str(e)})
+            return
+        self._send_json(200, result)
+
+    def _read_json_object(self):
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+        except ValueError:
+            raise ValueError("invalid Content-Length")
+        # rfile.read(-1) would block until the client disconnects
+        if length < 0:
+            raise ValueError("invalid Content-Length")
+        request = json.loads(self.rfile.read(length) or b"{}")
+        if not isinstance(request, dict):
+            raise ValueError("body must be a JSON object")
+        return request
+
+    def do_POST(self):
+        path = urlparse(self.path).path
+        if path == "/invalidate":
+            self._invalidate()
+            return
+        if path != "/forecast":
+            self._send_json(404, {"error": f"Unknown path {self.path}"})
+            return
+        try:
+            request = self._read_json_object()
+            tickers = request.get("tickers") or []
+            if not isinstance(tickers, list) or not tickers:
+                raise ValueError("tickers must be a non-empty list")
+            if not all(isinstance(t, str) for t in tickers):
+                raise ValueError("tickers must be strings")
+            for ticker in tickers:
+                validate_ticker(ticker)
+            kind, steps = parse_forecast_args(request.get("model", "arima"), request.get("steps", 1))
+        except ValueError as e:
+            self._send_json(400, {"error": str(e)})
+            return
+
+        # Submit everything before waiting so the whole request lands in as few batches as possible
+        futures = [(t, self.server.batcher.submit(kind, t, steps)) for t in tickers]
+        deadline = time.monotonic() + self.server.request_timeout
+        forecasts, errors = [], {}
+        for ticker, future in futures:
+            try:
+                forecasts.append(future.result(timeout=max(0.0, deadline - time.monotonic())))
+            except FutureTimeoutError:
+                self._send_json(504, {"error": "Timed out waiting for forecasts"})
+                return
+            except Exception as e:
+                errors[ticker] = str(e)
+        self._send_json(200, {"forecasts": forecasts, "errors": errors})
+
+    def _invalidate(self):
+        try:
+            request = self._read_json_object()
+            kind = request.get("model")
+            if kind is not None and kind not in MODEL_KINDS:
+                raise ValueError(f"model must be one of {', '.join(MODEL_KINDS)}")
+            tickers = request.get("tickers")
+            if tickers is not None:
+                if not isinstance(tickers, list) or not all(isinstance(t, str) for t in tickers):
+                    raise ValueError("tickers must be a list of strings")
+                tickers = set(tickers)
+        except ValueError as e:
+            self._send_json(400, {"error": str(e)})
+            return
+        self._send_json(200, {"invalidated": self.server.cache.invalidate(kind, tickers)})
+
+class ForecastHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+class ForecastUnixServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve forecasts from persisted ARIMA/LSTM models.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--socket", help="Listen on this Unix socket path instead of TCP")
+    parser.add_argument("--cache-size", type=int, default=int(os.getenv("FORECAST_CACHE_SIZE", 1000)),
+                        help="Maximum number of models kept in memory")
+    parser.add_argument("--batch-window-ms", type=float, default=5.0,
+                        help="How long to wait for concurrent requests to group into one batch")
+    parser.add_argument("--workers", type=int, default=4, help="Threads running forecast calls")
+    parser.add_argument("--request-timeout", type=float, default=REQUEST_TIMEOUT,
+                        help="Seconds to wait for a forecast before answering 504")
+    parser.add_argument("--preload", default="", help="Comma-separated arima tickers to load at startup")
+    parser.add_argument("--verbose", action="store_true", help="Log every request")
+    args = parser.parse_args()
+
+    cache = ModelCache(args.cache_size)
+    for ticker in filter(None, args.preload.split(",")):
+        try:
+            cache.get("arima", ticker.strip())
+        except FileNotFoundError as e:
+            print(f"Skipping preload: {e}")
+
+    if args.socket:
+        if os.path.exists(args.socket):
+            os.remove(args.socket)
+        server = ForecastUnixServer(args.socket, ForecastHandler)
+        address = args.socket
+    else:
+        server = ForecastHTTPServer((args.host, args.port), ForecastHandler)
+        address = f"http://{args.host}:{args.port}"
+
+    server.cache = cache
+    server.batcher = ForecastBatcher(
+        cache,
+        batch_window=args.batch_window_ms / 1000.0,
+        workers=args.workers,
+    )
+    server.request_timeout = args.request_timeout
+    server.verbose = args.verbose
+
+    print(f"Forecast server listening on {address} (cache size {args.cache_size})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if args.socket and os.path.exists(args.socket):
+            os.remove(args.socket)
+
+if __name__ == "__main__":
+    main()
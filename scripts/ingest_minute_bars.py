@@ -0,0 +1,294 @@
+import io
+import os
+import sys
+import time
+import threading
+from datetime import date
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+import pandas as pd
+
+from db import connect
+
+# Point at a mock server (see mock_polygon_server.py) for local testing
+POLYGON_BASE_URL = os.getenv("POLYGON_BASE_URL", "https://api.polygon.io").rstrip("/")
+
+PAGE_LIMIT = 50000
+# Rows buffered before each COPY + merge + rollup round trip
+FLUSH_ROWS = int(os.getenv("MINUTE_FLUSH_ROWS", 500000))
+FETCH_WORKERS = int(os.getenv("MINUTE_FETCH_WORKERS", 8))
+
+COLUMNS = ["ticker", "bar_time", "open", "high", "low", "close", "volume", "vwap", "transactions"]
+# Polygon aggregate keys for each column after ticker
+POLYGON_KEYS = {"t": "bar_time", "o": "open", "h": "high", "l": "low", "c": "close",
+                "v": "volume", "vw": "vwap", "n": "transactions"}
+
+STAGING_SQL = """
+    SET TIME ZONE 'UTC';
+    CREATE TEMP TABLE IF NOT EXISTS minute_bars_staging (
+        ticker VARCHAR(10),
+        bar_time TIMESTAMPTZ,
+        open NUMERIC(12, 4),
+        high NUMERIC(12, 4),
+        low NUMERIC(12, 4),
+        close NUMERIC(12, 4),
+        volume BIGINT,
+        vwap NUMERIC(12, 4),
+        transactions INT
+    );
+    CREATE TEMP TABLE IF NOT EXISTS touched_5m (ticker VARCHAR(10), bucket TIMESTAMPTZ);
+    CREATE TEMP TABLE IF NOT EXISTS touched_1h (ticker VARCHAR(10), bucket TIMESTAMPTZ);
+    CREATE TEMP TABLE IF NOT EXISTS touched_1d (ticker VARCHAR(10), trading_date DATE);
+    TRUNCATE minute_bars_staging, touched_5m, touched_1h, touched_1d;
+"""
+
+MERGE_SQL = """
+    INSERT INTO minute_bars (ticker, bar_time, open, high, low, close, volume, vwap, transactions)
+    SELECT DISTINCT ON (ticker, bar_time)
+        ticker, bar_time, open, high, low, close, volume, vwap, transactions
+    FROM minute_bars_staging
+    ON CONFLICT (ticker, bar_time) DO UPDATE SET
+        open = EXCLUDED.open, high = EXCLUDED.high, low = EXCLUDED.low, close = EXCLUDED.close,
+        volume = EXCLUDED.volume, vwap = EXCLUDED.vwap, transactions = EXCLUDED.transactions;
+
+    INSERT INTO touched_5m
+    SELECT DISTINCT ticker, date_bin('5 minutes', bar_time, TIMESTAMPTZ '2000-01-01 00:00:00+00')
+    FROM minute_bars_staging;
+
+    INSERT INTO touched_1h
+    SELECT DISTINCT ticker, date_trunc('hour', bucket) FROM touched_5m;
+
+    INSERT INTO touched_1d
+    SELECT DISTINCT ticker, (bucket AT TIME ZONE 'America/New_York')::date FROM touched_1h;
+"""
+
+# Each rollup is recomputed only for the (ticker, bucket) pairs the load touched,
+# from the next finer level: minutes -> 5m -> 1h -> 1d
+ROLLUP_SQL = """
+    INSERT INTO {target} (ticker, {bucket}, open, high, low, close, volume, vwap, transactions)
+    SELECT
+        s.ticker,
+        t.{bucket},
+        (array_agg(s.open ORDER BY s.{source_time}))[1],
+        MAX(s.high),
+        MIN(s.low),
+        (array_agg(s.close ORDER BY s.{source_time} DESC))[1],
+        SUM(s.volume),
+        SUM(s.vwap * s.volume) / NULLIF(SUM(s.volume), 0),
+        SUM(s.transactions)
+    FROM {touched} t
+    JOIN {source} s
+      ON s.ticker = t.ticker
+     AND s.{source_time} >= {start}
+     AND s.{source_time} < {end}
+    GROUP BY s.ticker, t.{bucket}
+    ON CONFLICT (ticker, {bucket}) DO UPDATE SET
+        open = EXCLUDED.open, high = EXCLUDED.high, low = EXCLUDED.low, close = EXCLUDED.close,
+        volume = EXCLUDED.volume, vwap = EXCLUDED.vwap, transactions = EXCLUDED.transactions;
+"""
+
+ROLLUPS = [
+    ROLLUP_SQL.format(target="minute_bars_5m", bucket="bucket", touched="touched_5m",
+                      source="minute_bars", source_time="bar_time",
+                      start="t.bucket", end="t.bucket + INTERVAL '5 minutes'"),
+    ROLLUP_SQL.format(target="minute_bars_1h", bucket="bucket", touched="touched_1h",
+                      source="minute_bars_5m", source_time="bucket",
+                      start="t.bucket", end="t.bucket + INTERVAL '1 hour'"),
+    ROLLUP_SQL.format(target="minute_bars_1d", bucket="trading_date", touched="touched_1d",
+                      source="minute_bars_1h", source_time="bucket",
+                      start="(t.trading_date::timestamp AT TIME ZONE 'America/New_York')",
+                      end="((t.trading_date + 1)::timestamp AT TIME ZONE 'America/New_York')"),
+]
+
+_local = threading.local()
+
+def _session():
+    # requests.Session isn't thread-safe, so each fetch thread keeps its own
+    if not hasattr(_local, "session"):
+        _local.session = requests.Session()
+    return _local.session
+
+def get_json(url, params, max_retries=3):
+    """
+    GET a Polygon URL, honoring Retry-After on HTTP 429.
+    Returns the JSON response or None if every attempt failed.
+    """
+    for attempt in range(max_retries):
+        try:
+            response = _session().get(url, params=params, timeout=30)
+            if response.status_code == 200:
+                return response.json()
+
+            elif response.status_code == 429:  # Too Many Requests
+                retry_after = int(response.headers.get("Retry-After", 60))
+                print(f"Rate limit hit. Retrying in {retry_after} seconds... (Attempt {attempt+1}/{max_retries})")
+                time.sleep(retry_after)
+
+            else:
+                response.raise_for_status()
+
+        except requests.exceptions.RequestException as e:
+            print(f"Error fetching {url}: {e}")
+            time.sleep(10)
+
+    return None
+
+def fetch_minute_bars(ticker, date_str, api_key):
+    """
+    Fetches all minute aggregates for `ticker` on `date_str`, following
+    Polygon's next_url pagination. Returns a DataFrame with COLUMNS, or None
+    if a request failed.
+    """
+    url = f"{POLYGON_BASE_URL}/v2/aggs/ticker/{ticker}/range/1/minute/{date_str}/{date_str}"
+    params = {"adjusted": "true", "sort": "asc", "limit": PAGE_LIMIT, "apiKey": api_key}
+
+    pages = []
+    while url:
+        data = get_json(url, params)
+        if data is None:
+            return None
+        if data.get("results"):
+            pages.append(pd.DataFrame.from_records(data["results"], columns=list(POLYGON_KEYS)))
+        url = data.get("next_url")
+        # next_url already carries the query, except for the API key
+        params = {"apiKey": api_key}
+
+    if not pages:
+        return pd.DataFrame(columns=COLUMNS)
+
+    df = pd.concat(pages, ignore_index=True).rename(columns=POLYGON_KEYS)
+    df["bar_time"] = pd.to_datetime(df["bar_time"], unit="ms", utc=True)
+    # Polygon may send volumes as floats; COPY into BIGINT/INT needs integers
+    df["volume"] = df["volume"].round().astype("Int64")
+    df["transactions"] = df["transactions"].astype("Int64")
+    df.insert(0, "ticker", ticker)
+    return df[COLUMNS]
+
+def month_partitions(start, end):
+    """Yields (name, from, to) for each month partition covering [start, end]."""
+    year, month = start.year, start.month
+    while (year, month) <= (end.year, end.month):
+        next_year, next_month = (year + 1, 1) if month == 12 else (year, month + 1)
+        yield (f"minute_bars_{year:04d}_{month:02d}",
+               date(year, month, 1).isoformat(),
+               date(next_year, next_month, 1).isoformat())
+        year, month = next_year, next_month
+
+class MinuteBarLoader:
+    """
+    Buffers fetched minute bars and, every `flush_rows` rows, bulk-loads them
+    with COPY into a staging table, merges them into the partitioned
+    minute_bars table and refreshes the 5m / 1h / 1d rollups they touch.
+    Each flush is one transaction, so re-running a date is safe.
+    """
+    def __init__(self, conn, flush_rows=FLUSH_ROWS):
+        self.conn = conn
+        self.flush_rows = flush_rows
+        self.rows_loaded = 0
+        self._frames = []
+        self._pending = 0
+
+    def add(self, frame):
+        if frame is None or frame.empty:
+            return
+        self._frames.append(frame)
+        self._pending += len(frame)
+        if self._pending >= self.flush_rows:
+            self.flush()
+
+    def flush(self):
+        if not self._frames:
+            return
+        df = pd.concat(self._frames, ignore_index=True)
+        self._frames, self._pending = [], 0
+
+        buffer = io.StringIO()
+        df.to_csv(buffer, index=False, header=False, date_format="%Y-%m-%d %H:%M:%S+00")
+        buffer.seek(0)
+
+        with self.conn:
+            cur = self.conn.cursor()
+            cur.execute(STAGING_SQL)
+            cur.copy_expert(f"COPY minute_bars_staging ({', '.join(COLUMNS)}) FROM STDIN WITH CSV", buffer)
+
+            for name, start, end in month_partitions(df["bar_time"].min(), df["bar_time"].max()):
+                cur.execute(f"""
+                    CREATE TABLE IF NOT EXISTS {name} PARTITION OF minute_bars
+                    FOR VALUES FROM ('{start} 00:00:00+00') TO ('{end} 00:00:00+00')
+                """)
+
+            cur.execute(MERGE_SQL)
+            for rollup in ROLLUPS:
+                cur.execute(rollup)
+            cur.close()
+
+        self.rows_loaded += len(df)
+        print(f"Loaded {len(df)} minute bars ({self.rows_loaded} total).")
+
+def get_tickers(conn, date_str):
+    """Tickers with a daily bar on `date_str` (ingested by ingest_polygon.py)."""
+    cur = conn.cursor()
+    cur.execute("SELECT ticker FROM daily_bars WHERE trading_date = %s ORDER BY ticker", (date_str,))
+    tickers = [row[0] for row in cur.fetchall()]
+    cur.close()
+    return tickers
+
+def main():
+    if len(sys.argv) < 2:
+        print("Usage: python ingest_minute_bars.py <YYYY-MM-DD> [TICKER ...]")
+        sys.exit(1)
+
+    start_time = time.time()
+    date_str = sys.argv[1]
+
+    POLYGON_API_KEY = os.getenv("POLYGON_API_KEY")
+    POSTGRES_USER = os.getenv("POSTGRES_USER")
+    POSTGRES_PASSWORD = os.getenv("POSTGRES_PASSWORD")
+    POSTGRES_DB = os.getenv("POSTGRES_DB")
+    POSTGRES_HOST = os.getenv("POSTGRES_HOST", "localhost")
+    POSTGRES_PORT = os.getenv("POSTGRES_PORT", 5432)
+
+    if not POLYGON_API_KEY:
+        print("Error: POLYGON_API_KEY is not set in environment variables.")
+        sys.exit(1)
+
+    conn = connect({
+        "user": POSTGRES_USER,
+        "password": POSTGRES_PASSWORD,
+        "host": POSTGRES_HOST,
+        "port": POSTGRES_PORT,
+        "dbname": POSTGRES_DB,
+    })
+
+    tickers = sys.argv[2:] or get_tickers(conn, date_str)
+    if not tickers:
+        print(f"No tickers in daily_bars for {date_str}; ingest the daily bars first or pass tickers.")
+        conn.close()
+        sys.exit(1)
+
+    print(f"Fetching minute bars for {len(tickers)} tickers on {date_str}...")
+    loader = MinuteBarLoader(conn)
+    failed = []
+
+    # Fetch in windows so only a bounded number of tickers is held in memory at once
+    window = FETCH_WORKERS * 4
+    with ThreadPoolExecutor(max_workers=FETCH_WORKERS) as pool:
+        for i in range(0, len(tickers), window):
+            chunk = tickers[i:i + window]
+            for ticker, frame in zip(chunk, pool.map(lambda t: fetch_minute_bars(t, date_str, POLYGON_API_KEY), chunk)):
+                if frame is None:
+                    failed.append(ticker)
+                else:
+                    loader.add(frame)
+    loader.flush()
+    conn.close()
+
+    duration = time.time() - start_time
+    print(f"Ingested {loader.rows_loaded} minute bars for {date_str} in {duration:.2f} seconds.")
+    if failed:
+        print(f"Failed to fetch {len(failed)} tickers: {', '.join(failed[:20])}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -1,17 +1,28 @@
+import io
 import os
+import csv
 import sys
 import requests
 import psycopg2
-from psycopg2.extras import execute_values
+import numpy as np
 from datetime import datetime
 import time
 
+from db import connect
+from data_quality import (
+    parse_grouped_daily, previous_closes, align_previous_closes, validate_batch,
+    quarantine_rows, reason_counts
+)
+
+# Point at a mock server (see mock_polygon_server.py) for local testing
+POLYGON_BASE_URL = os.getenv("POLYGON_BASE_URL", "https://api.polygon.io").rstrip("/")
+
 def fetch_grouped_daily(date_str, api_key, max_retries=3):
     """
     Fetches grouped daily bars for the given date (YYYY-MM-DD).
     Returns JSON response or None if failed.
     """
-    base_url = f"https://api.polygon.io/v2/aggs/grouped/locale/us/market/stocks/{date_str}"
+    base_url = f"{POLYGON_BASE_URL}/v2/aggs/grouped/locale/us/market/stocks/{date_str}"
     params = {
         "adjusted": "true",
         "apiKey": api_key
@@ -38,78 +49,60 @@ def fetch_grouped_daily(date_str, api_key, max_retries=3):
     print("Max retries reached. API request failed.")
     return None
 
-def insert_daily_bars(records, db_config):
+def insert_daily_bars(cur, date_str, bars, mask):
     """
-    Inserts a list of records into the daily_bars table.
-    Each record should be a dict: {
-        "ticker": str,
-        "date": str (YYYY-MM-DD),
-        "open": float,
-        "high": float,
-        "low": float,
-        "close": float,
-        "volume": int
-    }
+    Loads the rows of a parsed batch (see data_quality.parse_grouped_daily)
+    selected by `mask` into daily_bars with COPY. Rows already present for
+    the date are left unchanged, so a date can be re-ingested safely.
+    Returns the number of rows inserted.
     """
-    # Unpack db_config
-    user = db_config.get("user")
-    password = db_config.get("password")
-    host = db_config.get("host")
-    port = db_config.get("port")
-    database = db_config.get("dbname")
-
-    # Build insert query
-    insert_query = """
+    buffer = io.StringIO()
+    csv.writer(buffer, lineterminator="\n").writerows(zip(
+        bars["ticker"][mask].tolist(),
+        bars["open"][mask].tolist(),
+        bars["high"][mask].tolist(),
+        bars["low"][mask].tolist(),
+        bars["close"][mask].tolist(),
+        # Polygon sends volume as a float; daily_bars.volume is BIGINT
+        np.rint(bars["volume"][mask]).astype(np.int64).tolist()
+    ))
+    buffer.seek(0)
+
+    cur.execute("""
+        CREATE TEMP TABLE daily_bars_staging (
+            ticker VARCHAR(10),
+            open NUMERIC(12, 4),
+            high NUMERIC(12, 4),
+            low NUMERIC(12, 4),
+            close NUMERIC(12, 4),
+            volume BIGINT
+        ) ON COMMIT DROP
+    """)
+    cur.copy_expert("COPY daily_bars_staging (ticker, open, high, low, close, volume) FROM STDIN WITH CSV", buffer)
+    cur.execute("""
         INSERT INTO daily_bars (ticker, trading_date, open, high, low, close, volume)
-        VALUES %s
-    """
-
-    try:
-        # Connect to Postgres
-        conn = psycopg2.connect(
-            user=user,
-            password=password,
-            host=host,
-            port=port,
-            database=database
-        )
-        conn.autocommit = True
-        cur = conn.cursor()
-
-        # Bulk insert
-        records_list = [
-            (rec["ticker"], rec["date"], rec["open"], rec["high"], rec["low"], rec["close"], rec["volume"]) 
-            for rec in records
-        ]
-        execute_values(cur, insert_query, records_list)
-
-        cur.close()
-        conn.close()
-        print(f"Inserted {len(records)} rows into daily_bars.")
+        SELECT ticker, %s, open, high, low, close, volume FROM daily_bars_staging
+        ON CONFLICT (ticker, trading_date) DO NOTHING
+    """, (date_str,))
+    return cur.rowcount
 
-    except psycopg2.Error as e:
-        print(f"Database error: {e}")
-
-def insert_ingestion_log(date_str, row_count, duration, db_config):
+def insert_ingestion_log(date_str, row_count, duration, db_config, rejected_count=0, validation_seconds=None):
     """
     Inserts an ingestion log entry into the ingestion_logs table.
     """
     log_query = """
-        INSERT INTO ingestion_logs (ingestion_date, row_count, duration_seconds)
-        VALUES (%s, %s, %s)
+        INSERT INTO ingestion_logs (ingestion_date, row_count, duration_seconds, rejected_count, validation_seconds)
+        VALUES (%s, %s, %s, %s, %s)
     """
     try:
-        conn = psycopg2.connect(
-            user=db_config["user"],
-            password=db_config["password"],
-            host=db_config["host"],
-            port=db_config["port"],
-            database=db_config["dbname"]
-        )
+        conn = connect(db_config)
         conn.autocommit = True
         cur = conn.cursor()
         
-        cur.execute(log_query, (date_str, row_count, round(duration, 2)))
+        cur.execute(log_query, (
+            date_str, row_count, round(duration, 2), rejected_count,
+            round(validation_seconds, 4) if validation_seconds is not None else None
+        ))
         
         cur.close()
         conn.close()
@@ -117,12 +110,61 @@ def insert_ingestion_log(date_str, row_count, duration, db_config):
     except psycopg2.Error as e:
         print(f"Failed to log ingestion: {e}")
 
+def ingest_date(date_str, api_key, db_config):
+    """
+    Fetches one date's grouped daily bars from Polygon, validates the batch,
+    loads the valid rows into daily_bars and the rejected ones into
+    daily_bars_quarantine, and logs the run. Returns the number of rows
+    inserted, which is 0 if the date was already loaded, or None for a
+    non-trading date. Raises RuntimeError if the Polygon
+    request or the database load failed.
+    """
+    start_time = time.time()
+
+    # 1. Fetch data from Polygon
+    data = fetch_grouped_daily(date_str, api_key)
+    if not data or "resultsCount" not in data:
+        raise RuntimeError("No results found in Polygon response or API call failed.")
+    if not data["resultsCount"]:
+        print("Not a trading date")
+        return None
+
+    # 2. Parse the results into column arrays
+    polygon_records = data["results"]
+    bars = parse_grouped_daily(polygon_records)
+
+    try:
+        conn = connect(db_config)
+        try:
+            with conn, conn.cursor() as cur:
+                # 3. Validate the whole batch before loading it
+                validation_start = time.perf_counter()
+                prev_close = align_previous_closes(bars["ticker"], *previous_closes(conn, date_str))
+                flags = validate_batch(bars, prev_close)
+                validation_seconds = time.perf_counter() - validation_start
+
+                # 4. Load valid rows and quarantine the rest in one transaction
+                row_count = insert_daily_bars(cur, date_str, bars, flags == 0)
+                rejected_count = quarantine_rows(cur, date_str, bars, flags, prev_close, polygon_records)
+        finally:
+            conn.close()
+    except psycopg2.Error as e:
+        raise RuntimeError(f"Database error: {e}")
+
+    duration = time.time() - start_time
+    print(f"Inserted {row_count} rows into daily_bars.")
+    if rejected_count:
+        print(f"Quarantined {rejected_count} rows: {reason_counts(flags)}")
+    print(f"Validated {len(flags)} rows in {validation_seconds * 1000:.1f} ms "
+          f"({validation_seconds / duration * 100:.2f}% of ingest time).")
+    insert_ingestion_log(date_str, row_count, duration, db_config, rejected_count, validation_seconds)
+    return row_count
+
 def main():
     if len(sys.argv) < 2:
         print("Usage: python ingest_polygon.py <YYYY-MM-DD>")
         sys.exit(1)
 
-    start_time = time.time()
     date_str = sys.argv[1]
 
     # Get environment variables
@@ -149,45 +191,11 @@ def main():
         "dbname": POSTGRES_DB,
     }
 
-    # 1. Fetch data from Polygon
-    data = fetch_grouped_daily(date_str, POLYGON_API_KEY)
-    if not data or "resultsCount" not in data:
-        print("No results found in Polygon response or API call failed.")
+    try:
+        ingest_date(date_str, POLYGON_API_KEY, db_config)
+    except RuntimeError as e:
+        print(e)
         sys.exit(1)
-    if not data["resultsCount"]:
-        print("Not a trading date")
-        sys.exit(0)
-
-    # 2. Parse the results
-    polygon_records = data["results"]
-    records_to_insert = []
-    for item in polygon_records:
-        # item example: { 'T': 'AAPL', 'o': 123.45, 'h': 125.67, ... }
-        ticker = item.get("T")
-        open_price = item.get("o")
-        high = item.get("h")
-        low = item.get("l")
-        close = item.get("c")
-        volume = item.get("v")
-
-        # Build dict for insertion
-        record = {
-            "ticker": ticker,
-            "date": date_str,
-            "open": open_price,
-            "high": high,
-            "low": low,
-            "close": close,
-            "volume": volume
-        }
-        records_to_insert.append(record)
-
-    # 3. Insert into Postgres
-    insert_daily_bars(records_to_insert, db_config)
-
-    row_count = len(records_to_insert)
-    duration = time.time() - start_time
-    insert_ingestion_log(date_str, row_count, duration, db_config)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
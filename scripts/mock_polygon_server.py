@@ -0,0 +1,140 @@
+#!/usr/bin/env python
+"""
+Local stand-in for the Polygon aggregates endpoints used by the ingestion
+scripts, serving deterministic synthetic data:
+
+    /v2/aggs/grouped/locale/us/market/stocks/{date}
+    /v2/aggs/ticker/{ticker}/range/1/minute/{from}/{to}   (paginated via next_url)
+
+Run it and point the scripts at it with POLYGON_BASE_URL=http://127.0.0.1:8766.
+"""
+import re
+import json
+import random
+import argparse
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs, urlencode
+
+EASTERN = ZoneInfo("America/New_York")
+GROUPED_RE = re.compile(r"^/v2/aggs/grouped/locale/us/market/stocks/(\d{4}-\d{2}-\d{2})$")
+MINUTE_RE = re.compile(r"^/v2/aggs/ticker/([^/]+)/range/1/minute/(\d{4}-\d{2}-\d{2})/(\d{4}-\d{2}-\d{2})$")
+
+def trading_days(start, end):
+    day = datetime.strptime(start, "%Y-%m-%d")
+    last = datetime.strptime(end, "%Y-%m-%d")
+    while day <= last:
+        if day.weekday() < 5:
+            yield day
+        day += timedelta(days=1)
+
+def minute_bars(ticker, day):
+    """Regular-session (09:30-16:00 ET) random-walk minute bars for one ticker and day."""
+    rng = random.Random(f"{ticker}-{day:%Y-%m-%d}")
+    price = rng.uniform(5, 500)
+    session_open = datetime(day.year, day.month, day.day, 9, 30, tzinfo=EASTERN)
+    bars = []
+    for minute in range(390):
+        open_price = price
+        close_price = max(0.01, open_price * (1 + rng.gauss(0, 0.001)))
+        high = max(open_price, close_price) * (1 + abs(rng.gauss(0, 0.0005)))
+        low = min(open_price, close_price) * (1 - abs(rng.gauss(0, 0.0005)))
+        volume = rng.randint(100, 50000)
+        bars.append({
+            "t": int((session_open + timedelta(minutes=minute)).timestamp() * 1000),
+            "o": round(open_price, 4),
+            "h": round(high, 4),
+            "l": round(low, 4),
+            "c": round(close_price, 4),
+            "v": volume,
+            "vw": round((open_price + close_price + high + low) / 4, 4),
+            "n": rng.randint(1, 500),
+        })
+        price = close_price
+    return bars
+
+def daily_bar(ticker, day):
+    bars = minute_bars(ticker, day)
+    volume = sum(b["v"] for b in bars)
+    return {
+        "T": ticker,
+        "t": bars[0]["t"],
+        "o": bars[0]["o"],
+        "h": max(b["h"] for b in bars),
+        "l": min(b["l"] for b in bars),
+        "c": bars[-1]["c"],
+        "v": volume,
+        "vw": round(sum(b["vw"] * b["v"] for b in bars) / volume, 4),
+        "n": sum(b["n"] for b in bars),
+    }
+
+class MockPolygonHandler(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        params = {k: v[0] for k, v in parse_qs(url.query).items()}
+        if "apiKey" not in params:
+            self._send_json(401, {"status": "ERROR", "error": "API Key was not provided"})
+            return
+
+        match = GROUPED_RE.match(url.path)
+        if match:
+            day = datetime.strptime(match.group(1), "%Y-%m-%d")
+            results = [daily_bar(t, day) for t in self.server.tickers] if day.weekday() < 5 else []
+            self._send_json(200, {"status": "OK", "resultsCount": len(results), "results": results})
+            return
+
+        match = MINUTE_RE.match(url.path)
+        if match:
+            ticker, start, end = match.groups()
+            if ticker not in self.server.tickers:
+                self._send_json(200, {"ticker": ticker, "status": "OK", "resultsCount": 0})
+                return
+
+            bars = [b for day in trading_days(start, end) for b in minute_bars(ticker, day)]
+            limit = min(int(params.get("limit", 5000)), 50000)
+            cursor = int(params.get("cursor", 0))
+            page = bars[cursor:cursor + limit]
+            payload = {"ticker": ticker, "status": "OK", "resultsCount": len(page), "results": page}
+            if cursor + limit < len(bars):
+                # Like Polygon, next_url carries the query but not the API key
+                query = urlencode({"cursor": cursor + limit, "limit": limit})
+                payload["next_url"] = f"http://{self.headers['Host']}{url.path}?{query}"
+            self._send_json(200, payload)
+            return
+
+        self._send_json(404, {"status": "NOT_FOUND", "error": f"Unknown path {url.path}"})
+
+def main():
+    parser = argparse.ArgumentParser(description="Mock Polygon aggregates API for local testing.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--tickers", type=int, default=100, help="Number of synthetic tickers")
+    parser.add_argument("--verbose", action="store_true")
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer((args.host, args.port), MockPolygonHandler)
+    server.tickers = [f"TK{i:04d}" for i in range(args.tickers)]
+    server.verbose = args.verbose
+    print(f"Mock Polygon API on http://{args.host}:{args.port} with {args.tickers} tickers")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+if __name__ == "__main__":
+    main()
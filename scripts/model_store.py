@@ -0,0 +1,100 @@
+import os
+import re
+import pickle
+
+# Directory where trained models are persisted (one file set per ticker)
+MODEL_DIR = os.getenv("MODEL_DIR", "models")
+
+MODEL_KINDS = ("arima", "lstm")
+
+# Same width as daily_bars.ticker; anything else could escape MODEL_DIR
+TICKER_RE = re.compile(r"(?=.*[A-Za-z0-9])[A-Za-z0-9.\-]{1,10}")
+
+def validate_ticker(ticker):
+    """
+    Returns `ticker` if it is safe to use in a model file name, otherwise
+    raises ValueError.
+    """
+    if not isinstance(ticker, str) or not TICKER_RE.fullmatch(ticker):
+        raise ValueError(f"Invalid ticker: {ticker!r}")
+    return ticker
+
+def _model_path(kind, ticker, suffix):
+    return os.path.join(MODEL_DIR, kind, f"{validate_ticker(ticker)}{suffix}")
+
+def save_arima(ticker, model_fit):
+    """
+    Persists a fitted statsmodels ARIMA results object for `ticker`.
+    """
+    path = _model_path("arima", ticker, ".pkl")
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    model_fit.save(path)
+    return path
+
+def load_arima(ticker):
+    """
+    Loads the persisted ARIMA results object for `ticker`.
+    Raises FileNotFoundError if no model has been saved.
+    """
+    path = _model_path("arima", ticker, ".pkl")
+    if not os.path.isfile(path):
+        raise FileNotFoundError(f"No ARIMA model saved for {ticker} ({path})")
+    with open(path, "rb") as f:
+        return pickle.load(f)
+
+def save_lstm(ticker, model, scaler, last_window, last_date):
+    """
+    Persists a trained Keras LSTM for `ticker` together with what is needed
+    to forecast from it: the fitted scaler, the last `lookback` scaled values
+    and the date of the last observation.
+    """
+    model_path = _model_path("lstm", ticker, ".keras")
+    os.makedirs(os.path.dirname(model_path), exist_ok=True)
+    model.save(model_path)
+
+    meta = {
+        "scaler": scaler,
+        "last_window": last_window,
+        "last_date": last_date,
+    }
+    with open(_model_path("lstm", ticker, ".meta.pkl"), "wb") as f:
+        pickle.dump(meta, f)
+    return model_path
+
+def load_lstm(ticker):
+    """
+    Loads the persisted LSTM model and its metadata for `ticker`.
+    Returns (model, meta). Raises FileNotFoundError if no model has been saved.
+    """
+    model_path = _model_path("lstm", ticker, ".keras")
+    meta_path = _model_path("lstm", ticker, ".meta.pkl")
+    if not (os.path.isfile(model_path) and os.path.isfile(meta_path)):
+        raise FileNotFoundError(f"No LSTM model saved for {ticker} ({model_path})")
+
+    # TensorFlow is only imported once an LSTM model is actually needed
+    from tensorflow.keras.models import load_model
+
+    model = load_model(model_path)
+    with open(meta_path, "rb") as f:
+        meta = pickle.load(f)
+    return model, meta
+
+def model_mtime(kind, ticker):
+    """
+    Latest modification time of the files saved for (kind, ticker), used to
+    notice a retrained model. Raises FileNotFoundError if none is saved.
+    """
+    if kind == "arima":
+        paths = [_model_path("arima", ticker, ".pkl")]
+    elif kind == "lstm":
+        paths = [_model_path("lstm", ticker, ".keras"), _model_path("lstm", ticker, ".meta.pkl")]
+    else:
+        raise ValueError(f"Unknown model kind: {kind}")
+    return max(os.path.getmtime(path) for path in paths)
+
+def load_model(kind, ticker):
+    if kind == "arima":
+        return load_arima(ticker)
+    if kind == "lstm":
+        return load_lstm(ticker)
+    raise ValueError(f"Unknown model kind: {kind}")
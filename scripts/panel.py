@@ -0,0 +1,400 @@
+#!/usr/bin/env python
+import io
+import os
+import sys
+import json
+import time
+import argparse
+import numpy as np
+import pandas as pd
+
+from db import connect
+
+# Directory holding the memory-mapped panel files
+PANEL_DIR = os.getenv("PANEL_DIR", "panel")
+
+FIELDS = ("close", "daily_return", "volume")
+
+# Recent dates re-read on every update, so daily_return values computed by
+# transform_data.py after ingestion are picked up
+REFRESH_DATES = 5
+
+DATE_CHUNK = 256
+MIN_TICKER_CAPACITY = 1024
+
+class Panel:
+    """
+    Dense date x ticker float64 matrices for close, daily_return and volume,
+    stored as memory-mapped files (one row per trading date, one column per
+    ticker). Ticker columns never move once assigned; rows are only appended.
+    Missing values are NaN.
+    """
+    def __init__(self, path=PANEL_DIR, mode="r"):
+        self.path = path
+        self.mode = mode
+        meta_path = os.path.join(path, "meta.json")
+        if os.path.isfile(meta_path):
+            with open(meta_path) as f:
+                meta = json.load(f)
+        elif mode == "r":
+            raise FileNotFoundError(f"No panel found in {path}; run `python panel.py update` first.")
+        else:
+            meta = {"dates": [], "tickers": [], "date_capacity": 0, "ticker_capacity": 0}
+
+        self.dates = np.array(meta["dates"], dtype="datetime64[D]")
+        self.tickers = list(meta["tickers"])
+        self.ticker_index = {t: i for i, t in enumerate(self.tickers)}
+        self.date_capacity = meta["date_capacity"]
+        self.ticker_capacity = meta["ticker_capacity"]
+        self._maps = {}
+        if self.date_capacity:
+            for field in FIELDS:
+                self._maps[field] = self._open(field, "r" if mode == "r" else "r+")
+
+
+    def _file(self, field):
+        return os.path.join(self.path, f"{field}.f64")
+
+    def _open(self, field, mode, date_capacity=None, ticker_capacity=None, path=None):
+        return np.memmap(
+            path or self._file(field), dtype="float64", mode=mode,
+            shape=(date_capacity or self.date_capacity, ticker_capacity or self.ticker_capacity)
+        )
+
+    def _save_meta(self):
+        meta = {
+            "dates": [str(d) for d in self.dates],
+            "tickers": self.tickers,
+            "date_capacity": self.date_capacity,
+            "ticker_capacity": self.ticker_capacity,
+        }
+        tmp_path = os.path.join(self.path, "meta.json.tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(meta, f)
+        os.replace(tmp_path, os.path.join(self.path, "meta.json"))
+
+    def _reserve(self, n_dates, n_tickers):
+        """
+        Makes room for `n_dates` rows and `n_tickers` columns. Adding rows only
+        extends the files; adding columns past the capacity rewrites them.
+        """
+        os.makedirs(self.path, exist_ok=True)
+        date_capacity = self.date_capacity
+        if n_dates > date_capacity:
+            date_capacity = -(-n_dates // DATE_CHUNK) * DATE_CHUNK
+        ticker_capacity = self.ticker_capacity
+        if n_tickers > ticker_capacity:
+            ticker_capacity = max(MIN_TICKER_CAPACITY, ticker_capacity)
+            while ticker_capacity < n_tickers:
+                ticker_capacity *= 2
+
+        if ticker_capacity != self.ticker_capacity:
+            n_old = len(self.dates)
+            for field in FIELDS:
+                tmp_path = self._file(field) + ".tmp"
+                new_map = self._open(field, "w+", date_capacity, ticker_capacity, path=tmp_path)
+                new_map[:] = np.nan
+                if field in self._maps:
+                    new_map[:n_old, :self.ticker_capacity] = self._maps[field][:n_old]
+                new_map.flush()
+                del new_map
+                self._maps.pop(field, None)
+                os.replace(tmp_path, self._file(field))
+        elif date_capacity != self.date_capacity:
+            for field in FIELDS:
+                self._maps.pop(field, None)
+                with open(self._file(field), "r+b") as f:
+                    f.truncate(date_capacity * ticker_capacity * 8)
+
+        if (date_capacity, ticker_capacity) != (self.date_capacity, self.ticker_capacity):
+            old_capacity = self.date_capacity if ticker_capacity == self.ticker_capacity else date_capacity
+            self.date_capacity, self.ticker_capacity = date_capacity, ticker_capacity
+            for field in FIELDS:
+                self._maps[field] = self._open(field, "r+")
+                # Rows added by extending the file are zero-filled; mark them missing
+                self._maps[field][old_capacity:] = np.nan
+
+    def write(self, df):
+        """
+        Writes rows of a DataFrame with columns trading_date, ticker and FIELDS
+        into the panel. Dates must be new (after the last stored date) or
+        already present; new tickers get the next free columns.
+        """
+        if self.mode == "r":
+            raise ValueError("Panel was opened read-only")
+        if df.empty:
+            return 0
+
+        row_dates = df["trading_date"].to_numpy(dtype="datetime64[D]")
+        incoming = np.unique(row_dates)
+        last = self.dates[-1] if len(self.dates) else None
+        new_dates = incoming if last is None else incoming[incoming > last]
+        if last is not None:
+            missing = np.setdiff1d(incoming[incoming <= last], self.dates)
+            if len(missing):
+                raise ValueError(f"Cannot insert {len(missing)} dates before {last} "
+                                 f"(e.g. {missing[0]}); rebuild the panel with --rebuild.")
+
+        new_tickers = [t for t in pd.unique(df["ticker"]) if t not in self.ticker_index]
+        self._reserve(len(self.dates) + len(new_dates), len(self.tickers) + len(new_tickers))
+
+        self.dates = np.concatenate([self.dates, new_dates])
+        for ticker in new_tickers:
+            self.ticker_index[ticker] = len(self.tickers)
+            self.tickers.append(ticker)
+
+        rows = np.searchsorted(self.dates, row_dates)
+        cols = pd.Index(self.tickers).get_indexer(df["ticker"])
+        for field in FIELDS:
+            self._maps[field][rows, cols] = pd.to_numeric(df[field], errors="coerce").to_numpy(dtype="float64")
+            self._maps[field].flush()
+
+        self._save_meta()
+        return len(new_dates)
+
+
+    def matrix(self, field):
+        """Read view of the (dates x tickers) matrix for `field`."""
+        if field not in FIELDS:
+            raise ValueError(f"Unknown field {field}; expected one of {', '.join(FIELDS)}")
+        return self._maps[field][:len(self.dates), :len(self.tickers)]
+
+    def date_position(self, date=None):
+        """Row of the last stored date on or before `date` (default: latest)."""
+        if not len(self.dates):
+            raise ValueError("Panel is empty")
+        if date is None:
+            return len(self.dates) - 1
+        pos = np.searchsorted(self.dates, np.datetime64(date, "D"), side="right") - 1
+        if pos < 0:
+            raise ValueError(f"No data on or before {date}")
+        return int(pos)
+
+    def column(self, ticker, field="close"):
+        return pd.Series(self.matrix(field)[:, self.ticker_index[ticker]], index=self.dates, name=ticker)
+
+
+    def top_movers(self, date=None, n=10, field="daily_return"):
+        """
+        The `n` largest and `n` smallest values of `field` across all tickers
+        on `date`. Returns (gainers, losers) as Series indexed by ticker.
+        """
+        row = np.array(self.matrix(field)[self.date_position(date)])
+        valid = np.flatnonzero(~np.isnan(row))
+        n = min(n, len(valid))
+        if n == 0:
+            empty = pd.Series(dtype="float64")
+            return empty, empty
+        values = row[valid]
+        top = valid[np.argpartition(-values, n - 1)[:n]]
+        bottom = valid[np.argpartition(values, n - 1)[:n]]
+        top = top[np.argsort(-row[top])]
+        bottom = bottom[np.argsort(row[bottom])]
+        tickers = np.array(self.tickers)
+        return (pd.Series(row[top], index=tickers[top], name=field),
+                pd.Series(row[bottom], index=tickers[bottom], name=field))
+
+    def cross_sectional_rank(self, field="daily_return", date=None, pct=True):
+        """
+        Rank of every ticker's `field` on `date` (1 = smallest). With `pct`,
+        ranks are scaled to (0, 1]. Tickers without a value get NaN.
+        """
+        row = np.array(self.matrix(field)[self.date_position(date)])
+        valid = ~np.isnan(row)
+        ranks = np.full(row.shape, np.nan)
+        order = np.argsort(row[valid], kind="stable")
+        r = np.empty(len(order))
+        r[order] = np.arange(1, len(order) + 1)
+        ranks[valid] = r / len(order) if pct else r
+        return pd.Series(ranks, index=self.tickers, name=f"{field}_rank")
+
+    def _window(self, field, window, date, periods):
+        end = self.date_position(date) + 1
+        start = max(0, end - periods - window + 1)
+        return np.array(self.matrix(field)[start:end]), self.dates[start:end]
+
+    def rolling_stat(self, field="daily_return", window=20, stat="mean", date=None, periods=1, min_periods=None):
+        """
+        Rolling mean or std of `field` for every ticker over the last `periods`
+        dates ending at `date`. Returns a (periods x tickers) DataFrame.
+        """
+        if stat not in ("mean", "std"):
+            raise ValueError("stat must be 'mean' or 'std'")
+        min_periods = min_periods or window
+        x, dates = self._window(field, window, date, periods)
+        mask = ~np.isnan(x)
+        x0 = np.where(mask, x, 0.0)
+
+        n = _window_sum(mask.astype("float64"), window)
+        sx = _window_sum(x0, window)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mean = sx / n
+            if stat == "mean":
+                out = mean
+            else:
+                sxx = _window_sum(x0 * x0, window)
+                out = np.sqrt(np.maximum(sxx - n * mean * mean, 0.0) / (n - 1))
+        out[n < max(min_periods, 2 if stat == "std" else 1)] = np.nan
+        return pd.DataFrame(out, index=dates[window - 1:], columns=self.tickers)
+
+    def rolling_corr(self, benchmark="SPY", field="daily_return", window=60, date=None, periods=1, min_periods=None):
+        """
+        Rolling correlation of every ticker's `field` against `benchmark` over
+        the last `periods` dates ending at `date`, using the dates where both
+        have values. Returns a (periods x tickers) DataFrame.
+        """
+        if benchmark not in self.ticker_index:
+            raise ValueError(f"Benchmark {benchmark} not in panel")
+        min_periods = min_periods or window
+        x, dates = self._window(field, window, date, periods)
+        b = x[:, [self.ticker_index[benchmark]]]
+
+        mask = ~np.isnan(x) & ~np.isnan(b)
+        x0 = np.where(mask, x, 0.0)
+        b0 = np.where(mask, b, 0.0)
+
+        n = _window_sum(mask.astype("float64"), window)
+        sx = _window_sum(x0, window)
+        sb = _window_sum(b0, window)
+        sxx = _window_sum(x0 * x0, window)
+        sbb = _window_sum(b0 * b0, window)
+        sxb = _window_sum(x0 * b0, window)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            cov = n * sxb - sx * sb
+            var = (n * sxx - sx * sx) * (n * sbb - sb * sb)
+            corr = cov / np.sqrt(var)
+        corr[(n < max(min_periods, 2)) | ~(var > 0)] = np.nan
+        return pd.DataFrame(corr, index=dates[window - 1:], columns=self.tickers)
+
+def _window_sum(a, window):
+    """Sums over each trailing `window` rows of `a` (rows window-1 .. end)."""
+    c = np.cumsum(a, axis=0)
+    out = c[window - 1:].copy()
+    out[1:] -= c[:-window]
+    return out
+
+def load_daily_bars(conn, start_date=None, end_date=None):
+    """
+    Reads daily_bars rows between `start_date` and `end_date` (inclusive, both
+    optional) with a single COPY.
+    """
+    conditions, params = [], []
+    if start_date is not None:
+        conditions.append("trading_date >= %s")
+        params.append(str(start_date))
+    if end_date is not None:
+        conditions.append("trading_date <= %s")
+        params.append(str(end_date))
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+
+    cur = conn.cursor()
+    query = cur.mogrify(f"""
+        SELECT trading_date, ticker, close, daily_return, volume
+        FROM daily_bars
+        {where}
+        ORDER BY trading_date
+    """, params).decode()
+
+    buffer = io.StringIO()
+    cur.copy_expert(f"COPY ({query}) TO STDOUT WITH CSV HEADER", buffer)
+    cur.close()
+    buffer.seek(0)
+    return pd.read_csv(buffer, keep_default_na=False, na_values=[""], dtype={"ticker": str},
+                       parse_dates=["trading_date"])
+
+def update_panel(db_config, path=PANEL_DIR, rebuild=False):
+    """
+    Appends dates newer than the panel's last date (re-reading the last
+    REFRESH_DATES dates) from daily_bars. An empty panel is built one year
+    at a time to bound memory. Returns the number of new dates.
+    """
+    if rebuild and os.path.isdir(path):
+        # Only remove the panel's own files; `path` may hold anything else
+        owned = ["meta.json", "meta.json.tmp"]
+        for field in FIELDS:
+            owned += [f"{field}.f64", f"{field}.f64.tmp"]
+        for name in owned:
+            file_path = os.path.join(path, name)
+            if os.path.isfile(file_path):
+                os.remove(file_path)
+
+    panel = Panel(path, mode="r+")
+
+    conn = connect(db_config)
+    added = 0
+    try:
+        if len(panel.dates):
+            added = panel.write(load_daily_bars(conn, panel.dates[-REFRESH_DATES:][0]))
+        else:
+            cur = conn.cursor()
+            cur.execute("SELECT MIN(trading_date), MAX(trading_date) FROM daily_bars")
+            first, last = cur.fetchone()
+            cur.close()
+            for year in range(first.year, last.year + 1) if first else []:
+                added += panel.write(load_daily_bars(conn, f"{year}-01-01", f"{year}-12-31"))
+                print(f"Loaded {year}: {len(panel.dates)} dates x {len(panel.tickers)} tickers.")
+    finally:
+        conn.close()
+
+    print(f"Panel updated: {added} new dates, {len(panel.dates)} dates x {len(panel.tickers)} tickers.")
+    return added
+
+def main():
+    parser = argparse.ArgumentParser(description="Date x ticker panel screener over daily_bars.")
+    parser.add_argument("--path", default=PANEL_DIR)
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("update", help="Append new dates from daily_bars")
+    p.add_argument("--rebuild", action="store_true", help="Rebuild the panel from scratch")
+
+    p = sub.add_parser("top-movers", help="Largest and smallest daily returns")
+    p.add_argument("--date")
+    p.add_argument("--n", type=int, default=10)
+
+    p = sub.add_parser("rank", help="Cross-sectional percentile rank of a field")
+    p.add_argument("field", choices=FIELDS)
+    p.add_argument("--date")
+    p.add_argument("--n", type=int, default=20, help="Number of top-ranked tickers to print")
+
+    p = sub.add_parser("corr", help="Rolling correlation of daily returns against a benchmark")
+    p.add_argument("--benchmark", default="SPY")
+    p.add_argument("--window", type=int, default=60)
+    p.add_argument("--date")
+    p.add_argument("--n", type=int, default=20, help="Number of most correlated tickers to print")
+
+    args = parser.parse_args()
+
+    if args.command == "update":
+        db_config = {
+            "user": os.getenv("POSTGRES_USER"),
+            "password": os.getenv("POSTGRES_PASSWORD"),
+            "host": os.getenv("POSTGRES_HOST", "localhost"),
+            "port": os.getenv("POSTGRES_PORT", 5432),
+            "dbname": os.getenv("POSTGRES_DB"),
+        }
+        update_panel(db_config, args.path, rebuild=args.rebuild)
+        return
+
+    try:
+        panel = Panel(args.path)
+    except FileNotFoundError as e:
+        print(e)
+        sys.exit(1)
+
+    start = time.perf_counter()
+    if args.command == "top-movers":
+        gainers, losers = panel.top_movers(args.date, args.n)
+        result = f"Top gainers:\n{gainers.to_string()}\n\nTop losers:\n{losers.to_string()}"
+    elif args.command == "rank":
+        ranks = panel.cross_sectional_rank(args.field, args.date)
+        result = ranks.dropna().nlargest(args.n).to_string()
+    else:
+        corr = panel.rolling_corr(args.benchmark, window=args.window, date=args.date).iloc[-1]
+        result = corr.dropna().nlargest(args.n).to_string()
+    elapsed = (time.perf_counter() - start) * 1000
+
+    print(result)
+    print(f"\n{len(panel.dates)} dates x {len(panel.tickers)} tickers, query took {elapsed:.1f} ms")
+
+if __name__ == "__main__":
+    main()
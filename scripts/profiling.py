@@ -0,0 +1,249 @@
+#!/usr/bin/env python
+"""
+Opt-in instrumentation for the training scripts.
+
+Set FINANCE_PROFILE=1 to record wall time, CPU time and peak memory for each
+phase of a run and write a JSON report to FINANCE_PROFILE_DIR (default
+"profiles/"). Optionally:
+    FINANCE_PROFILE_CPROFILE=1     also run cProfile (saves a .prof file, top functions in the report)
+    FINANCE_PROFILE_TRACEMALLOC=1  track Python allocations (per-phase peak, top allocation sites)
+
+Compare two reports with:
+    python profiling.py compare profiles/old.json profiles/new.json
+"""
+import os
+import sys
+import json
+import time
+import functools
+import subprocess
+from contextlib import contextmanager
+from datetime import datetime
+
+PROFILE_DIR = os.getenv("FINANCE_PROFILE_DIR", "profiles")
+TOP_N = 25
+
+def _env_flag(name):
+    return os.getenv(name, "").lower() in ("1", "true", "yes")
+
+def _max_rss_mb():
+    try:
+        import resource
+    except ImportError:  # Not available on Windows
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and kilobytes on Linux
+    return rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+class RunProfiler:
+    """
+    Collects per-phase timings for one run. Phases with the same name (e.g.
+    one `fit` per tuning configuration) are aggregated.
+    """
+    def __init__(self, name, label=None, cprofile=False, trace_memory=False, output_dir=PROFILE_DIR):
+        self.name = name
+        self.label = label
+        self.cprofile = cprofile
+        self.trace_memory = trace_memory
+        self.output_dir = output_dir
+        self.phases = {}
+        self._stack = []
+        self._profile = None
+
+    def start(self):
+        self.started_at = datetime.now()
+        self._wall = time.perf_counter()
+        self._cpu = time.process_time()
+        if self.trace_memory:
+            import tracemalloc
+            tracemalloc.start()
+        if self.cprofile:
+            import cProfile
+            self._profile = cProfile.Profile()
+            self._profile.enable()
+
+    @contextmanager
+    def phase(self, name):
+        if self.trace_memory:
+            import tracemalloc
+            # Fold the enclosing phase's peak so far into its record before resetting
+            if self._stack:
+                self._stack[-1]["peak"] = max(self._stack[-1]["peak"], tracemalloc.get_traced_memory()[1])
+            tracemalloc.reset_peak()
+
+        frame = {"peak": 0}
+        self._stack.append(frame)
+        rss_before = _max_rss_mb()
+        wall, cpu = time.perf_counter(), time.process_time()
+        try:
+            yield
+        finally:
+            wall = time.perf_counter() - wall
+            cpu = time.process_time() - cpu
+            self._stack.pop()
+
+            record = self.phases.setdefault(name, {"calls": 0, "wall_s": 0.0, "cpu_s": 0.0})
+            record["calls"] += 1
+            record["wall_s"] += wall
+            record["cpu_s"] += cpu
+            # ru_maxrss is the process's lifetime peak, so the phase's own cost is how far it
+            # pushed that peak up; phases that stay under an earlier peak show 0
+            rss_after = _max_rss_mb()
+            record["process_max_rss_mb_so_far"] = rss_after
+            if rss_after is not None:
+                record["max_rss_growth_mb"] = max(record.get("max_rss_growth_mb", 0.0), rss_after - rss_before)
+            if self.trace_memory:
+                import tracemalloc
+                peak = max(frame["peak"], tracemalloc.get_traced_memory()[1])
+                record["peak_traced_mb"] = max(record.get("peak_traced_mb", 0.0), peak / (1024 * 1024))
+                if self._stack:
+                    self._stack[-1]["peak"] = max(self._stack[-1]["peak"], peak)
+
+    def stop(self, exit_status=0):
+        report = {
+            "script": self.name,
+            "argv": sys.argv[1:],
+            "label": self.label,
+            "started_at": self.started_at.isoformat(timespec="seconds"),
+            "git_commit": _git_commit(),
+            "python": sys.version.split()[0],
+            "exit_status": exit_status,
+            "total": {
+                "wall_s": time.perf_counter() - self._wall,
+                "cpu_s": time.process_time() - self._cpu,
+                "max_rss_mb": _max_rss_mb(),
+            },
+            "phases": self.phases,
+        }
+
+        os.makedirs(self.output_dir, exist_ok=True)
+        prefix = f"{self.name}_{self.label}" if self.label else self.name
+        base = os.path.join(self.output_dir, f"{prefix}_{self.started_at:%Y%m%d_%H%M%S}")
+
+        if self._profile is not None:
+            import pstats
+            self._profile.disable()
+            self._profile.dump_stats(f"{base}.prof")
+            stats = pstats.Stats(self._profile)
+            top = sorted(stats.stats.items(), key=lambda item: item[1][3], reverse=True)[:TOP_N]
+            report["cprofile"] = {
+                "file": f"{base}.prof",
+                "top_cumulative": [
+                    {
+                        "function": f"{func[0]}:{func[1]}({func[2]})",
+                        "ncalls": nc,
+                        "tottime_s": tt,
+                        "cumtime_s": ct,
+                    }
+                    for func, (cc, nc, tt, ct, callers) in top
+                ],
+            }
+
+        if self.trace_memory:
+            import tracemalloc
+            snapshot = tracemalloc.take_snapshot()
+            tracemalloc.stop()
+            report["tracemalloc"] = {
+                "top_allocations": [
+                    {"location": str(stat.traceback), "size_kb": stat.size / 1024, "count": stat.count}
+                    for stat in snapshot.statistics("lineno")[:TOP_N]
+                ],
+            }
+
+        with open(f"{base}.json", "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Profile report written to {base}.json")
+        return f"{base}.json"
+
+_active = None
+
+def profiled_run(name):
+    """
+    Decorator for a script's entry function. When FINANCE_PROFILE is set, the
+    run is profiled and a report is written when the function returns or exits.
+    Positional arguments (e.g. the ticker) are added to the report's file name.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            global _active
+            if not _env_flag("FINANCE_PROFILE"):
+                return func(*args, **kwargs)
+
+            _active = RunProfiler(
+                name,
+                label="_".join(str(a) for a in args) or None,
+                cprofile=_env_flag("FINANCE_PROFILE_CPROFILE"),
+                trace_memory=_env_flag("FINANCE_PROFILE_TRACEMALLOC"),
+            )
+            _active.start()
+            exit_status = 0
+            try:
+                return func(*args, **kwargs)
+            except SystemExit as e:
+                # sys.exit("message") exits with status 1, sys.exit() with 0
+                exit_status = e.code if isinstance(e.code, int) else (0 if e.code is None else 1)
+                raise
+            except BaseException:
+                exit_status = 1
+                raise
+            finally:
+                profiler, _active = _active, None
+                profiler.stop(exit_status)
+        return wrapper
+    return decorator
+
+@contextmanager
+def phase(name):
+    """
+    Times the enclosed block as phase `name` of the current profiled run.
+    Does nothing unless profiling is enabled.
+    """
+    if _active is None:
+        yield
+        return
+    with _active.phase(name):
+        yield
+
+def compare_reports(old_path, new_path):
+    with open(old_path) as f:
+        old = json.load(f)
+    with open(new_path) as f:
+        new = json.load(f)
+
+    print(f"{old['script']} {old.get('git_commit')} -> {new['script']} {new.get('git_commit')}")
+    # Memory column: the phase's traced peak with FINANCE_PROFILE_TRACEMALLOC, otherwise how
+    # much it raised the process's max RSS; for TOTAL, the process's max RSS
+    print(f"{'phase':<24}{'wall old':>10}{'wall new':>10}{'change':>9}{'cpu old':>10}{'cpu new':>10}{'mem MB':>10}")
+
+    def row(label, a, b):
+        a, b = a or {}, b or {}
+        wall_a, wall_b = a.get("wall_s"), b.get("wall_s")
+        change = f"{(wall_b - wall_a) / wall_a * 100:+.1f}%" if wall_a and wall_b is not None else "n/a"
+        peak = b.get("peak_traced_mb", b.get("max_rss_growth_mb", b.get("max_rss_mb")))
+        fmt = lambda v: f"{v:.3f}" if v is not None else "-"
+        print(f"{label:<24}{fmt(wall_a):>10}{fmt(wall_b):>10}{change:>9}"
+              f"{fmt(a.get('cpu_s')):>10}{fmt(b.get('cpu_s')):>10}{fmt(peak):>10}")
+
+    for name in list(old["phases"]) + [p for p in new["phases"] if p not in old["phases"]]:
+        row(name, old["phases"].get(name), new["phases"].get(name))
+    row("TOTAL", old["total"], new["total"])
+
+def main():
+    if len(sys.argv) != 4 or sys.argv[1] != "compare":
+        print("Usage: python profiling.py compare <old_report.json> <new_report.json>")
+        sys.exit(1)
+    compare_reports(sys.argv[2], sys.argv[3])
+
+if __name__ == "__main__":
+    main()
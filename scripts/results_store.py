@@ -0,0 +1,135 @@
+import os
+import sys
+from psycopg2 import sql
+from psycopg2.extras import execute_values, RealDictCursor
+
+from db import connect
+
+# Typed columns for each tuning results table (see sql/create_tuning_tables.sql)
+RESULT_COLUMNS = {
+    "arima_tuning_results": [
+        "ticker", "seasonal", "m", "p", "d", "q",
+        "seasonal_p", "seasonal_d", "seasonal_q", "aic", "rmse", "mape",
+    ],
+    "lstm_tuning_results": [
+        "ticker", "lookback", "units", "epochs", "batch_size", "rmse", "mape",
+    ],
+}
+
+class ResultsWriter:
+    """
+    Buffers tuning results in memory and writes them to `table` in batches.
+    Each flush is a single multi-row INSERT in its own transaction, so any
+    number of tuning processes can write to the same table concurrently.
+
+    Use as a context manager so the remaining rows are flushed on exit:
+
+        with ResultsWriter("lstm_tuning_results", db_config) as writer:
+            writer.add(ticker="AAPL", lookback=30, ...)
+    """
+    def __init__(self, table, db_config, batch_size=500):
+        if table not in RESULT_COLUMNS:
+            raise ValueError(f"Unknown results table: {table}")
+        self.table = table
+        self.columns = RESULT_COLUMNS[table]
+        self.db_config = db_config
+        self.batch_size = batch_size
+        self._rows = []
+        self._conn = None
+
+    def add(self, **row):
+        missing = set(self.columns) - set(row)
+        if missing:
+            raise ValueError(f"Missing columns for {self.table}: {', '.join(sorted(missing))}")
+        # NumPy scalars (e.g. from pmdarima orders) can't be adapted by psycopg2
+        self._rows.append(tuple(
+            row[c].item() if hasattr(row[c], "item") else row[c] for c in self.columns
+        ))
+        if len(self._rows) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if not self._rows:
+            return
+        if self._conn is None:
+            self._conn = connect(self.db_config)
+
+        insert_query = sql.SQL("INSERT INTO {} ({}) VALUES %s").format(
+            sql.Identifier(self.table),
+            sql.SQL(", ").join(map(sql.Identifier, self.columns))
+        )
+        with self._conn:
+            with self._conn.cursor() as cur:
+                execute_values(cur, insert_query.as_string(self._conn), self._rows, page_size=self.batch_size)
+        print(f"Wrote {len(self._rows)} rows to {self.table}.")
+        self._rows = []
+
+    def close(self):
+        try:
+            self.flush()
+        finally:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+def best_config_per_ticker(table, db_config, tickers=None, metric="mape"):
+    """
+    Returns the best row (lowest `metric`) for each ticker in `table`,
+    optionally restricted to `tickers`. Every allowed metric has a
+    (ticker, metric) index (see sql/create_tuning_tables.sql), so this never
+    sorts the whole table.
+    """
+    if table not in RESULT_COLUMNS:
+        raise ValueError(f"Unknown results table: {table}")
+    if metric not in ("mape", "rmse", "aic") or metric not in RESULT_COLUMNS[table]:
+        raise ValueError(f"Cannot rank {table} by {metric}")
+
+    query = sql.SQL("""
+        SELECT DISTINCT ON (ticker) *
+        FROM {table}
+        WHERE {metric} IS NOT NULL AND {metric} <> 'NaN'
+          {ticker_filter}
+        ORDER BY ticker, {metric}
+    """).format(
+        table=sql.Identifier(table),
+        metric=sql.Identifier(metric),
+        ticker_filter=sql.SQL("AND ticker = ANY(%s)") if tickers else sql.SQL("")
+    )
+
+    conn = connect(db_config)
+    try:
+        with conn.cursor(cursor_factory=RealDictCursor) as cur:
+            cur.execute(query, (list(tickers),) if tickers else None)
+            return cur.fetchall()
+    finally:
+        conn.close()
+
+def main():
+    if len(sys.argv) < 2 or sys.argv[1] not in ("arima", "lstm"):
+        print("Usage: python results_store.py <arima|lstm> [TICKER ...]")
+        sys.exit(1)
+
+    db_config = {
+        "user": os.getenv("POSTGRES_USER"),
+        "password": os.getenv("POSTGRES_PASSWORD"),
+        "host": os.getenv("POSTGRES_HOST", "localhost"),
+        "port": os.getenv("POSTGRES_PORT", 5432),
+        "dbname": os.getenv("POSTGRES_DB"),
+    }
+
+    table = f"{sys.argv[1]}_tuning_results"
+    rows = best_config_per_ticker(table, db_config, tickers=sys.argv[2:] or None)
+    if not rows:
+        print(f"No results found in {table}.")
+        return
+    for row in rows:
+        print(", ".join(f"{k}={v}" for k, v in row.items() if k not in ("id",)))
+
+if __name__ == "__main__":
+    main()
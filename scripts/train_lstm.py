@@ -4,11 +4,9 @@ import sys
 import numpy as np
 import pandas as pd
 from sqlalchemy import create_engine
-import tensorflow as tf
-from tensorflow.keras import Sequential
-from tensorflow.keras.layers import LSTM, Dense, Input
-from sklearn.preprocessing import MinMaxScaler
 from math import sqrt
+from model_store import save_lstm
+from profiling import profiled_run, phase
 
 def mean_absolute_percentage_error(y_true, y_pred):
     y_true, y_pred = np.array(y_true), np.array(y_pred)
@@ -26,11 +24,19 @@ def prepare_sequences(series, lookback=30):
         y.append(series[i])
     return np.array(X), np.array(y)
 
-def main():
-    ticker = "AAPL"
-    if len(sys.argv) > 1:
-        ticker = sys.argv[1]
-
+@profiled_run("train_lstm")
+def run(ticker):
+    try:
+        _train(ticker)
+    finally:
+        # Drop this ticker's Keras models and graph state so finance.py can train many
+        # tickers in one process without growing memory. TensorFlow is not imported if
+        # the run stopped before it was needed.
+        if "tensorflow" in sys.modules:
+            import tensorflow as tf
+            tf.keras.backend.clear_session()
+
+def _train(ticker):
     POSTGRES_USER = os.getenv("POSTGRES_USER")
     POSTGRES_PASSWORD = os.getenv("POSTGRES_PASSWORD")
     POSTGRES_DB = os.getenv("POSTGRES_DB")
@@ -48,26 +54,35 @@ def main():
         WHERE ticker = '{ticker}'
         ORDER BY trading_date
     """
-    df = pd.read_sql(query, engine)
+    with phase("db_load"):
+        df = pd.read_sql(query, engine)
     if df.empty:
         sys.exit(f"No data for {ticker}.")
 
     # Convert to datetime, freq='B', forward-fill
-    df['trading_date'] = pd.to_datetime(df['trading_date'])
-    df.set_index('trading_date', inplace=True)
-    df.sort_index(inplace=True)
-    df = df.asfreq('B', method='ffill')
-    df.dropna(subset=['close'], inplace=True)
+    with phase("preprocess"):
+        df['trading_date'] = pd.to_datetime(df['trading_date'])
+        df.set_index('trading_date', inplace=True)
+        df.sort_index(inplace=True)
+        df = df.asfreq('B', method='ffill')
+        df.dropna(subset=['close'], inplace=True)
 
     if df.empty:
         sys.exit("No valid data after freq assignment.")
 
+    # TensorFlow and scikit-learn are only imported once there is data to train on
+    with phase("imports"):
+        from sklearn.preprocessing import MinMaxScaler
+        from tensorflow.keras import Sequential
+        from tensorflow.keras.layers import LSTM, Dense, Input
+
     # Convert close to a NumPy array
     values = df['close'].values
 
     # Normalize data (optional): scale between 0 and 1
-    scaler = MinMaxScaler()
-    values_scaled = scaler.fit_transform(values.reshape(-1,1)).flatten()
+    with phase("scale"):
+        scaler = MinMaxScaler()
+        values_scaled = scaler.fit_transform(values.reshape(-1,1)).flatten()
 
     # Train/Test split
     split_idx = int(len(values_scaled) * 0.8)
@@ -75,26 +90,30 @@ def main():
     test_vals = values_scaled[split_idx:]
 
     lookback = 30
-    X_train, y_train = prepare_sequences(train_vals, lookback=lookback)
-    X_test, y_test = prepare_sequences(test_vals, lookback=lookback)
+    with phase("windows"):
+        X_train, y_train = prepare_sequences(train_vals, lookback=lookback)
+        X_test, y_test = prepare_sequences(test_vals, lookback=lookback)
 
-    # Reshape for LSTM: (samples, timesteps, features=1)
-    X_train = X_train.reshape((X_train.shape[0], X_train.shape[1], 1))
-    X_test = X_test.reshape((X_test.shape[0], X_test.shape[1], 1))
+        # Reshape for LSTM: (samples, timesteps, features=1)
+        X_train = X_train.reshape((X_train.shape[0], X_train.shape[1], 1))
+        X_test = X_test.reshape((X_test.shape[0], X_test.shape[1], 1))
 
     # Build simple LSTM model
-    model = Sequential([
-        Input(shape=(30, 1)),  # Use this instead of passing input_shape in LSTM
-        LSTM(50),
-        Dense(1)
-    ])
-    model.compile(optimizer='adam', loss='mse')
+    with phase("build"):
+        model = Sequential([
+            Input(shape=(30, 1)),  # Use this instead of passing input_shape in LSTM
+            LSTM(50),
+            Dense(1)
+        ])
+        model.compile(optimizer='adam', loss='mse')
 
     # Train
-    model.fit(X_train, y_train, epochs=10, batch_size=32, verbose=1)
+    with phase("fit"):
+        model.fit(X_train, y_train, epochs=10, batch_size=32, verbose=1)
 
     # Predict on test
-    y_pred_scaled = model.predict(X_test).flatten()
+    with phase("predict"):
+        y_pred_scaled = model.predict(X_test).flatten()
 
     # Invert scaling
     y_pred = scaler.inverse_transform(y_pred_scaled.reshape(-1,1)).flatten()
@@ -110,5 +129,16 @@ def main():
     print(f"RMSE: {rmse:.4f}")
     print(f"MAPE: {mape:.2f}%")
 
+    # Persist the model with its scaler and the latest input window for the forecast server
+    with phase("save_model"):
+        model_path = save_lstm(ticker, model, scaler, values_scaled[-lookback:], df.index[-1])
+    print(f"Saved LSTM model to {model_path}")
+
+def main():
+    ticker = "AAPL"
+    if len(sys.argv) > 1:
+        ticker = sys.argv[1]
+    run(ticker)
+
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -9,15 +9,18 @@ import numpy as np
 import pandas as pd
 from math import sqrt
 from sqlalchemy import create_engine
-from pmdarima import auto_arima
 from statsmodels.tsa.arima.model import ARIMA
+from model_store import save_arima
+from arima_search import ArimaSearchCache, fit_auto_arima
+from profiling import profiled_run, phase
 
 def mean_absolute_percentage_error(y_true, y_pred):
     """Calculate Mean Absolute Percentage Error (MAPE)."""
     y_true, y_pred = np.array(y_true), np.array(y_pred)
     return np.mean(np.abs((y_true - y_pred) / y_true)) * 100
 
-def main():
+@profiled_run("train_model")
+def run(ticker):
     """
     This script performs the following steps:
       1. Retrieves daily 'close' price data for a given ticker from a PostgreSQL database.
@@ -27,11 +30,6 @@ def main():
       5. Evaluates the model using RMSE and MAPE on the test set and shows forecast vs actual prices.
       6. Re-fits the best model on the entire dataset using statsmodels’ ARIMA and forecasts one step ahead.
     """
-    # Default ticker; can be overridden by a command-line argument
-    ticker = "AAPL"
-    if len(sys.argv) > 1:
-        ticker = sys.argv[1]
-
     # Retrieve PostgreSQL credentials from environment variables
     POSTGRES_USER = os.getenv("POSTGRES_USER")
     POSTGRES_PASSWORD = os.getenv("POSTGRES_PASSWORD")
@@ -43,6 +41,14 @@ def main():
     if not all([POSTGRES_USER, POSTGRES_PASSWORD, POSTGRES_DB]):
         sys.exit("Error: Please set POSTGRES_USER, POSTGRES_PASSWORD, and POSTGRES_DB environment variables.")
 
+    db_config = {
+        "user": POSTGRES_USER,
+        "password": POSTGRES_PASSWORD,
+        "host": POSTGRES_HOST,
+        "port": POSTGRES_PORT,
+        "dbname": POSTGRES_DB,
+    }
+
     # Build SQLAlchemy engine
     engine = create_engine(
         f"postgresql://{POSTGRES_USER}:{POSTGRES_PASSWORD}@{POSTGRES_HOST}:{POSTGRES_PORT}/{POSTGRES_DB}"
@@ -55,16 +61,18 @@ def main():
         WHERE ticker = '{ticker}'
         ORDER BY trading_date
     """
-    df = pd.read_sql(query, engine)
+    with phase("db_load"):
+        df = pd.read_sql(query, engine)
     if df.empty:
         sys.exit(f"Error: No data found for ticker {ticker} in daily_bars.")
 
     # Process the data: convert trading_date to datetime, set as index, sort, and ensure a business-day frequency
-    df['trading_date'] = pd.to_datetime(df['trading_date'])
-    df.set_index('trading_date', inplace=True)
-    df.sort_index(inplace=True)
-    df = df.asfreq('B', method='ffill')  # Fill missing business days (e.g. weekends/holidays)
-    df.dropna(subset=['close'], inplace=True)
+    with phase("preprocess"):
+        df['trading_date'] = pd.to_datetime(df['trading_date'])
+        df.set_index('trading_date', inplace=True)
+        df.sort_index(inplace=True)
+        df = df.asfreq('B', method='ffill')  # Fill missing business days (e.g. weekends/holidays)
+        df.dropna(subset=['close'], inplace=True)
     if df.empty:
         sys.exit("Error: No valid 'close' data after frequency assignment.")
 
@@ -75,27 +83,33 @@ def main():
 
     print("Finding best ARIMA parameters using stepwise search to minimize AIC...\n")
     
-    # Use auto_arima to perform a stepwise search for the best ARIMA model (no seasonality assumed)
-    auto_model = auto_arima(
-        train_data,
-        seasonal=False,
-        stepwise=True,
-        suppress_warnings=True,
-        error_action="ignore",
-        trace=True
-    )
+    # Use auto_arima to perform a stepwise search for the best ARIMA model (no seasonality assumed),
+    # reusing cached differencing tests and starting from the ticker's last best order
+    with phase("auto_arima"):
+        with ArimaSearchCache(db_config) as search_cache:
+            auto_model = fit_auto_arima(
+                train_data,
+                ticker,
+                search_cache,
+                seasonal=False,
+                stepwise=True,
+                suppress_warnings=True,
+                error_action="ignore",
+                trace=True
+            )
 
     # Display the best model summary
     print("\nBest model found:")
     print(auto_model.summary())
 
     # Forecast the test period using the best model found
-    forecast_test = auto_model.predict(n_periods=len(test_data))
-    forecast_test = pd.Series(forecast_test, index=test_data.index)
+    with phase("evaluate"):
+        forecast_test = auto_model.predict(n_periods=len(test_data))
+        forecast_test = pd.Series(forecast_test, index=test_data.index)
 
-    # Evaluate model performance on the test set
-    rmse = sqrt(np.mean((forecast_test - test_data) ** 2))
-    mape = mean_absolute_percentage_error(test_data, forecast_test)
+        # Evaluate model performance on the test set
+        rmse = sqrt(np.mean((forecast_test - test_data) ** 2))
+        mape = mean_absolute_percentage_error(test_data, forecast_test)
 
     print("\n=== Model Performance on Test Set ===")
     print(f"RMSE: {rmse:.4f}")
@@ -109,15 +123,28 @@ def main():
     # Re-fit the best model on the entire dataset using statsmodels’ ARIMA
     order = auto_model.order  # Get the best order from auto_arima
     print("\nRe-fitting best ARIMA model on the entire dataset...")
-    final_model = ARIMA(df['close'], order=order)
-    final_model_fit = final_model.fit()
+    with phase("refit"):
+        final_model = ARIMA(df['close'], order=order)
+        final_model_fit = final_model.fit()
 
-    # Forecast one step ahead
-    final_forecast = final_model_fit.forecast(steps=1)
+        # Forecast one step ahead
+        final_forecast = final_model_fit.forecast(steps=1)
     final_forecast_date = final_forecast.index[0]
     final_forecast_value = final_forecast.iloc[0]
 
     print(f"\nOne-step-ahead forecast after re-fit: {final_forecast_date}, {final_forecast_value:.2f}")
 
+    # Persist the re-fit model so the forecast server can serve it without retraining
+    with phase("save_model"):
+        model_path = save_arima(ticker, final_model_fit)
+    print(f"Saved ARIMA model to {model_path}")
+
+def main():
+    # Default ticker; can be overridden by a command-line argument
+    ticker = "AAPL"
+    if len(sys.argv) > 1:
+        ticker = sys.argv[1]
+    run(ticker)
+
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -1,8 +1,9 @@
 import os
 import sys
-import psycopg2
 from datetime import datetime, timedelta
 
+from db import connect
+
 def get_last_trading_date(conn, target_date):
     """
     Get the most recent available trading date before `target_date`.
@@ -29,13 +30,13 @@ def compute_daily_returns(target_date):
     POSTGRES_HOST = os.getenv("POSTGRES_HOST", "localhost")
     POSTGRES_PORT = os.getenv("POSTGRES_PORT", 5432)
 
-    conn = psycopg2.connect(
-        user=POSTGRES_USER,
-        password=POSTGRES_PASSWORD,
-        host=POSTGRES_HOST,
-        port=POSTGRES_PORT,
-        database=POSTGRES_DB
-    )
+    conn = connect({
+        "user": POSTGRES_USER,
+        "password": POSTGRES_PASSWORD,
+        "host": POSTGRES_HOST,
+        "port": POSTGRES_PORT,
+        "dbname": POSTGRES_DB,
+    })
     conn.autocommit = True
     cur = conn.cursor()
 
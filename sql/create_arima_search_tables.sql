@@ -0,0 +1,31 @@
+-- Differencing orders (d, D) chosen by the unit-root / seasonal tests,
+-- keyed by a fingerprint of the training series they were computed on
+CREATE TABLE IF NOT EXISTS arima_diff_tests (
+    ticker VARCHAR(10) NOT NULL,
+    fingerprint CHAR(40) NOT NULL,
+    m SMALLINT NOT NULL,
+    d SMALLINT NOT NULL,
+    seasonal_d SMALLINT NOT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (ticker, fingerprint, m)
+);
+
+-- Last best order per ticker and seasonal config, used to warm-start the next search
+CREATE TABLE IF NOT EXISTS arima_warm_starts (
+    ticker VARCHAR(10) NOT NULL,
+    seasonal BOOLEAN NOT NULL,
+    m SMALLINT NOT NULL,
+    p SMALLINT NOT NULL,
+    d SMALLINT NOT NULL,
+    q SMALLINT NOT NULL,
+    seasonal_p SMALLINT NOT NULL,
+    seasonal_d SMALLINT NOT NULL,
+    seasonal_q SMALLINT NOT NULL,
+    aic DOUBLE PRECISION,
+    nobs INT NOT NULL,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (ticker, seasonal, m)
+);
+
+CREATE INDEX IF NOT EXISTS idx_arima_warm_starts_profile
+    ON arima_warm_starts (seasonal, m, d, seasonal_d);
@@ -0,0 +1,55 @@
+-- Raw minute aggregates, partitioned by month on bar_time.
+-- ingest_minute_bars.py creates the monthly partitions (minute_bars_YYYY_MM) as needed.
+CREATE TABLE IF NOT EXISTS minute_bars (
+    ticker VARCHAR(10) NOT NULL,
+    bar_time TIMESTAMPTZ NOT NULL,
+    open NUMERIC(12, 4),
+    high NUMERIC(12, 4),
+    low NUMERIC(12, 4),
+    close NUMERIC(12, 4),
+    volume BIGINT,
+    vwap NUMERIC(12, 4),
+    transactions INT,
+    PRIMARY KEY (ticker, bar_time)
+) PARTITION BY RANGE (bar_time);
+
+-- Rollups kept up to date by ingest_minute_bars.py for the buckets each load touches
+CREATE TABLE IF NOT EXISTS minute_bars_5m (
+    ticker VARCHAR(10) NOT NULL,
+    bucket TIMESTAMPTZ NOT NULL,
+    open NUMERIC(12, 4),
+    high NUMERIC(12, 4),
+    low NUMERIC(12, 4),
+    close NUMERIC(12, 4),
+    volume BIGINT,
+    vwap NUMERIC(12, 4),
+    transactions BIGINT,
+    PRIMARY KEY (ticker, bucket)
+);
+
+CREATE TABLE IF NOT EXISTS minute_bars_1h (
+    ticker VARCHAR(10) NOT NULL,
+    bucket TIMESTAMPTZ NOT NULL,
+    open NUMERIC(12, 4),
+    high NUMERIC(12, 4),
+    low NUMERIC(12, 4),
+    close NUMERIC(12, 4),
+    volume BIGINT,
+    vwap NUMERIC(12, 4),
+    transactions BIGINT,
+    PRIMARY KEY (ticker, bucket)
+);
+
+-- Daily bars built from minutes, including pre/post market (trading_date in US/Eastern)
+CREATE TABLE IF NOT EXISTS minute_bars_1d (
+    ticker VARCHAR(10) NOT NULL,
+    trading_date DATE NOT NULL,
+    open NUMERIC(12, 4),
+    high NUMERIC(12, 4),
+    low NUMERIC(12, 4),
+    close NUMERIC(12, 4),
+    volume BIGINT,
+    vwap NUMERIC(12, 4),
+    transactions BIGINT,
+    PRIMARY KEY (ticker, trading_date)
+);
@@ -0,0 +1,27 @@
+-- Grouped daily bars rejected by the validation stage in ingest_polygon.py (see data_quality.py).
+-- Values are stored as received, so columns are wider than in daily_bars.
+CREATE TABLE IF NOT EXISTS daily_bars_quarantine (
+    id BIGSERIAL PRIMARY KEY,
+    ticker TEXT,
+    trading_date DATE NOT NULL,
+    open DOUBLE PRECISION,
+    high DOUBLE PRECISION,
+    low DOUBLE PRECISION,
+    close DOUBLE PRECISION,
+    volume DOUBLE PRECISION,
+    prev_close DOUBLE PRECISION,
+    reason_codes TEXT[] NOT NULL,
+    raw JSONB,
+    quarantined_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS daily_bars_quarantine_date_idx
+    ON daily_bars_quarantine (trading_date);
+
+-- Previous-close lookups for the price jump check filter on trading_date alone
+CREATE INDEX IF NOT EXISTS daily_bars_trading_date_idx
+    ON daily_bars (trading_date);
+
+-- Per-run validation stats
+ALTER TABLE ingestion_logs ADD COLUMN IF NOT EXISTS rejected_count INT;
+ALTER TABLE ingestion_logs ADD COLUMN IF NOT EXISTS validation_seconds NUMERIC(10, 4);
@@ -0,0 +1,41 @@
+CREATE TABLE IF NOT EXISTS arima_tuning_results (
+    id BIGSERIAL PRIMARY KEY,
+    run_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    ticker VARCHAR(10) NOT NULL,
+    seasonal BOOLEAN NOT NULL,
+    m SMALLINT NOT NULL,
+    p SMALLINT NOT NULL,
+    d SMALLINT NOT NULL,
+    q SMALLINT NOT NULL,
+    seasonal_p SMALLINT NOT NULL,
+    seasonal_d SMALLINT NOT NULL,
+    seasonal_q SMALLINT NOT NULL,
+    aic DOUBLE PRECISION,
+    rmse DOUBLE PRECISION,
+    mape DOUBLE PRECISION
+);
+
+-- One index per metric best_config_per_ticker() can rank by
+CREATE INDEX IF NOT EXISTS idx_arima_tuning_ticker_mape
+    ON arima_tuning_results (ticker, mape);
+CREATE INDEX IF NOT EXISTS idx_arima_tuning_ticker_rmse
+    ON arima_tuning_results (ticker, rmse);
+CREATE INDEX IF NOT EXISTS idx_arima_tuning_ticker_aic
+    ON arima_tuning_results (ticker, aic);
+
+CREATE TABLE IF NOT EXISTS lstm_tuning_results (
+    id BIGSERIAL PRIMARY KEY,
+    run_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    ticker VARCHAR(10) NOT NULL,
+    lookback INT NOT NULL,
+    units INT NOT NULL,
+    epochs INT NOT NULL,
+    batch_size INT NOT NULL,
+    rmse DOUBLE PRECISION,
+    mape DOUBLE PRECISION
+);
+
+CREATE INDEX IF NOT EXISTS idx_lstm_tuning_ticker_mape
+    ON lstm_tuning_results (ticker, mape);
+CREATE INDEX IF NOT EXISTS idx_lstm_tuning_ticker_rmse
+    ON lstm_tuning_results (ticker, rmse);